@@ -0,0 +1,349 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from concurrency import controller
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token in characters, used to budget prompts and outputs
+CHARS_PER_TOKEN = 4
+
+
+class PromptStage:
+    """One RAGAS metric prompt applied to many independent inputs.
+
+    ``prompt`` is the metric's own RAGAS prompt object: the batched request
+    repeats its instruction, output schema and worked examples once, lists the
+    inputs by id and asks for one output per id, each parsed into the prompt's
+    output model. ``output_tokens`` estimates how many tokens one input's
+    output needs so batches stay within ``max_tokens``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prompt: Any,
+        output_tokens: Callable[[Any], int],
+    ):
+        self.name = name
+        self.ragas_prompt = prompt
+        self.output_tokens = output_tokens
+
+    def render(self, item: Any) -> str:
+        return item.model_dump_json(exclude_none=True)
+
+    def prompt(self, items: List[Any]) -> str:
+        ragas_prompt = self.ragas_prompt
+        inputs = ",\n".join(
+            f'{{"id": {i}, "input": {self.render(item)}}}'
+            for i, item in enumerate(items)
+        )
+        # The prompt's own helpers render the schema and examples, so they
+        # read exactly as in a single-sample RAGAS call
+        return (
+            f"{ragas_prompt.instruction}\n"
+            + ragas_prompt._generate_output_signature()
+            + "\n"
+            + ragas_prompt._generate_examples()
+            + "\n-----------------------------\n"
+            + f"\nNow perform the same for each of the following {len(items)} "
+            "independent inputs. Handle each input on its own, exactly as in the "
+            "examples, and answer with a single JSON object of the form "
+            '{"results": [{"id": <input id>, "output": <output for that input>}, '
+            "...]} containing exactly one entry per input id. Output only the "
+            "JSON.\n" + f"inputs: [\n{inputs}\n]\n" + "Output: "
+        )
+
+    def parse(self, text: str) -> Dict[int, Any]:
+        """Map input id to its parsed output model, leaving out invalid outputs"""
+        outputs = {}
+        for item_id, entry in parse_results(text).items():
+            try:
+                outputs[item_id] = self.ragas_prompt.output_model.model_validate(
+                    entry.get("output")
+                )
+            except ValueError:
+                # pydantic's ValidationError; the input is retried like a
+                # missing one
+                continue
+        return outputs
+
+
+def parse_results(text: str) -> Dict[int, Dict[str, Any]]:
+    """Map item id to its result object from a judge reply, tolerating fences"""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        payload = json.loads(text[start : end + 1])
+    except json.JSONDecodeError:
+        return {}
+    results = payload.get("results") if isinstance(payload, dict) else None
+    if not isinstance(results, list):
+        return {}
+    return {
+        entry["id"]: entry
+        for entry in results
+        if isinstance(entry, dict) and isinstance(entry.get("id"), int)
+    }
+
+
+class BatchedJudge:
+    """Packs the same prompt stage for many items into few judge requests.
+
+    Items are grouped greedily until the estimated output would exceed
+    ``max_tokens`` or the prompt would exceed ``max_input_chars``. Items missing
+    from a reply are retried in halves, down to single-item requests, so one
+    malformed answer does not lose the whole batch. A request that raises is
+    not retried here beyond the throttling retries of the controller.
+    """
+
+    def __init__(
+        self,
+        complete: Callable[[str], str],
+        max_tokens: int = 4096,
+        max_input_chars: int = 200000,
+        max_items: int = 50,
+    ):
+        self.complete = complete
+        self.max_tokens = max_tokens
+        self.max_input_chars = max_input_chars
+        self.max_items = max_items
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def pack(self, stage: PromptStage, items: List[Any]) -> List[List[int]]:
+        """Group item indices into batches that fit the token and size budgets"""
+        # Leave headroom for the JSON wrapper and estimation error
+        output_budget = int(self.max_tokens * 0.8)
+        batches, current = [], []
+        output_tokens = input_chars = 0
+        for index, item in enumerate(items):
+            item_output = stage.output_tokens(item)
+            item_input = len(stage.render(item))
+            if current and (
+                output_tokens + item_output > output_budget
+                or input_chars + item_input > self.max_input_chars
+                or len(current) >= self.max_items
+            ):
+                batches.append(current)
+                current, output_tokens, input_chars = [], 0, 0
+            current.append(index)
+            output_tokens += item_output
+            input_chars += item_input
+        if current:
+            batches.append(current)
+        return batches
+
+    def run(self, stage: PromptStage, items: List[Any]) -> List[Optional[Any]]:
+        """Run a stage over all items, returning one output (or None) per item"""
+        outputs: List[Optional[Any]] = [None] * len(items)
+        if not items:
+            return outputs
+
+        batches = self.pack(stage, items)
+        logger.info(
+            f"Judge stage {stage.name}: {len(items)} items in {len(batches)} requests"
+        )
+        workers = min(len(batches), controller.max_workers("bedrock"))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(
+                executor.map(
+                    lambda batch: self._run_batch(stage, items, batch, outputs),
+                    batches,
+                )
+            )
+        return outputs
+
+    def _run_batch(
+        self,
+        stage: PromptStage,
+        items: List[Any],
+        batch: List[int],
+        outputs: List[Optional[Any]],
+        split_unparsed: bool = True,
+    ):
+        with self._lock:
+            self.request_count += 1
+        try:
+            reply = controller.call(
+                "bedrock", self.complete, stage.prompt([items[i] for i in batch])
+            )
+        except Exception as e:
+            # Auth, validation and input-size errors would fail the same way
+            # for every smaller batch, so the whole batch is given up
+            logger.error(
+                f"Judge stage {stage.name} request for {len(batch)} items failed: "
+                f"{str(e)[:200]}..."
+            )
+            return
+
+        parsed = stage.parse(reply)
+        missing = []
+        for position, index in enumerate(batch):
+            if position in parsed:
+                outputs[index] = parsed[position]
+            else:
+                missing.append(index)
+
+        if not missing:
+            return
+        # Items left out of a reply that parsed are retried in halves. A reply
+        # that did not parse at all (e.g. output cut off by the token limit)
+        # is split only once, so a judge that never answers in JSON costs at
+        # most two extra requests per batch.
+        if len(batch) > 1 and (parsed or split_unparsed):
+            half = len(missing) // 2 or 1
+            for part in (missing[:half], missing[half:]):
+                if part:
+                    self._run_batch(
+                        stage, items, part, outputs, split_unparsed=bool(parsed)
+                    )
+        else:
+            logger.warning(
+                f"Judge stage {stage.name} gave no result for {len(missing)} items"
+            )
+
+
+class BatchedMetricExecutor:
+    """Scores RAGAS metrics for many samples with multi-item judge prompts.
+
+    Every stage sends the metric's own RAGAS prompt (instruction, output schema
+    and examples) for many samples at once and parses each answer into that
+    prompt's output model; the metric's own scoring then turns the outputs into
+    a score. Only the packing of several inputs into one request differs from
+    scoring one sample at a time. ``metric`` returns the RAGAS metric object
+    for a metric name. Each sample is a dict with ``question``, ``response``,
+    ``contexts`` and ``reference``.
+    """
+
+    SUPPORTED = {"faithfulness", "context_precision", "context_recall"}
+
+    def __init__(self, judge: BatchedJudge, metric: Callable[[str], Any]):
+        self.judge = judge
+        self.metric = metric
+
+    def score(
+        self, metric_name: str, samples: List[Dict[str, Any]]
+    ) -> List[Optional[float]]:
+        scorer = getattr(self, f"_{metric_name}")
+        return scorer(self.metric(metric_name), samples)
+
+    def _faithfulness(
+        self, metric: Any, samples: List[Dict[str, Any]]
+    ) -> List[Optional[float]]:
+        statement_prompt = metric.statement_generator_prompt
+        statements = self.judge.run(
+            PromptStage(
+                "statements",
+                statement_prompt,
+                # Statements restate the answer, repeating its subjects
+                lambda item: 30 + len(item.answer) * 3 // (2 * CHARS_PER_TOKEN),
+            ),
+            [
+                statement_prompt.input_model(
+                    question=s["question"], answer=s["response"]
+                )
+                for s in samples
+            ],
+        )
+
+        scores: List[Optional[float]] = [None] * len(samples)
+        nli_prompt = metric.nli_statements_prompt
+        nli_items, owners = [], []
+        for index, (sample, result) in enumerate(zip(samples, statements)):
+            if result is None:
+                continue
+            if not result.statements:
+                # RAGAS scores an answer without statements as NaN
+                scores[index] = float("nan")
+                continue
+            nli_items.append(
+                nli_prompt.input_model(
+                    context="\n".join(sample["contexts"]),
+                    statements=result.statements,
+                )
+            )
+            owners.append(index)
+
+        verdicts = self.judge.run(
+            PromptStage(
+                "faithfulness_nli",
+                nli_prompt,
+                # Each verdict repeats its statement and gives a reason
+                lambda item: 20
+                + sum(50 + len(s) // CHARS_PER_TOKEN for s in item.statements),
+            ),
+            nli_items,
+        )
+        for index, result in zip(owners, verdicts):
+            if result is not None:
+                scores[index] = metric._compute_score(result)
+        return scores
+
+    def _context_precision(
+        self, metric: Any, samples: List[Dict[str, Any]]
+    ) -> List[Optional[float]]:
+        prompt = metric.context_precision_prompt
+        items, owners = [], []
+        for index, sample in enumerate(samples):
+            for context in sample["contexts"]:
+                # RAGAS judges each chunk against the reference as the answer
+                items.append(
+                    prompt.input_model(
+                        question=sample["question"],
+                        context=context,
+                        answer=sample["reference"],
+                    )
+                )
+                owners.append(index)
+
+        verifications: List[List[Any]] = [[] for _ in samples]
+        for index, result in zip(
+            owners,
+            self.judge.run(
+                PromptStage("context_precision", prompt, lambda item: 80), items
+            ),
+        ):
+            verifications[index].append(result)
+
+        # Average precision over the ranked chunks, as RAGAS computes it
+        return [
+            (
+                None
+                if None in sample_verifications
+                else metric._calculate_average_precision(sample_verifications)
+            )
+            for sample_verifications in verifications
+        ]
+
+    def _context_recall(
+        self, metric: Any, samples: List[Dict[str, Any]]
+    ) -> List[Optional[float]]:
+        prompt = metric.context_recall_prompt
+        results = self.judge.run(
+            PromptStage(
+                "context_recall",
+                prompt,
+                # One classification, with its sentence and a reason, per
+                # reference sentence
+                lambda item: 20
+                + len(item.answer) // CHARS_PER_TOKEN
+                + 40 * (item.answer.count(".") + 1),
+            ),
+            [
+                prompt.input_model(
+                    question=s["question"],
+                    context="\n".join(s["contexts"]),
+                    answer=s["reference"],
+                )
+                for s in samples
+            ],
+        )
+        return [
+            None if result is None else metric._compute_score(result.classifications)
+            for result in results
+        ]
@@ -0,0 +1,65 @@
+import csv
+import threading
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+ENCODING = "utf-8"
+
+
+def _lines(file: BinaryIO) -> Iterator[str]:
+    for line in iter(file.readline, b""):
+        yield line.decode(ENCODING)
+
+
+class CaseFile:
+    """Test case CSV read on demand instead of held in memory.
+
+    Opening the file scans it once and keeps only the byte offset where each
+    row starts (8 bytes per row). ``case_file[i]`` seeks there and parses that
+    single row, so the question and ground truth texts of a 100k-row input are
+    never all in memory at once. Rows may span several lines (quoted
+    newlines); the csv reader pulls exactly the lines of one row, so offsets
+    stay exact.
+    """
+
+    def __init__(self, path: str, limit: Optional[int] = None):
+        self.path = path
+        self._file = open(path, mode="rb")
+        self._lock = threading.Lock()
+        self._offsets = array("q")
+
+        lines = _lines(self._file)
+        self.fieldnames: List[str] = next(csv.reader(lines), [])
+        reader = csv.reader(lines)
+        while limit is None or len(self._offsets) < limit:
+            offset = self._file.tell()
+            row = next(reader, None)
+            if row is None:
+                break
+            # csv.DictReader skips blank lines as well
+            if row:
+                self._offsets.append(offset)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> Dict[str, str]:
+        with self._lock:
+            self._file.seek(self._offsets[index])
+            row = next(csv.reader(_lines(self._file)))
+        # Same shape as csv.DictReader rows: missing trailing fields are None
+        values = row + [None] * (len(self.fieldnames) - len(row))
+        return dict(zip(self.fieldnames, values))
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "CaseFile":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
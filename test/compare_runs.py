@@ -0,0 +1,378 @@
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Result columns produced by rag_evaluation.py that hold judge scores
+METRIC_FAMILIES = (
+    "context_precision",
+    "context_recall",
+    "faithfulness",
+    "noise_sensitivity",
+)
+
+# Columns every results CSV needs to be paired and filtered
+REQUIRED_COLUMNS = ("product_id", "question", "status")
+
+# Runs written before the results recorded a scorer always used RAGAS
+DEFAULT_SCORER = "ragas"
+
+# Noise sensitivity counts mistakes, so a drop is an improvement
+LOWER_IS_BETTER = ("noise_sensitivity",)
+
+# The bootstrap resamples deltas rounded to this many decimals, which caps the
+# number of distinct values (and so the resampling cost) at any run size. The
+# resampled means are shifted back by the rounding error of the mean.
+DELTA_DECIMALS = 2
+
+
+def load_run(
+    path: str,
+) -> Tuple[pa.Array, Dict[str, np.ndarray], Dict[str, np.ndarray], List[str]]:
+    """Read a results CSV into alignment keys, metric scores, skips and scorers.
+
+    Rows repeating an earlier (product_id, question) are dropped. Scores of
+    rows whose status is not SUCCESS, and empty scores, become NaN. The skip
+    masks mark rows where a metric was left unscored on purpose.
+
+    The file is parsed with pyarrow, and the join keys stay in Arrow memory:
+    turning every question into a Python string took most of the load time.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)} column")
+
+    metric_names = [name for name in header if name.startswith(METRIC_FAMILIES)]
+    text_columns = list(REQUIRED_COLUMNS)
+    text_columns += [name for name in ("scorer", "skipped_metrics") if name in header]
+    table = pa_csv.read_csv(
+        path,
+        # Parsing blocks in parallel only pays off with several cores
+        read_options=pa_csv.ReadOptions(use_threads=pa.cpu_count() > 1),
+        # Questions, ground truths and error messages may span several lines
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=[*text_columns, *metric_names],
+            column_types={
+                **{name: pa.string() for name in text_columns},
+                **{name: pa.float64() for name in metric_names},
+            },
+            strings_can_be_null=False,
+        ),
+    )
+
+    keys = pc.binary_join_element_wise(
+        table["product_id"], table["question"], "\x1f"
+    ).combine_chunks()
+    # index_in finds the first row holding each key, so later repeats differ
+    first = pc.index_in(keys, value_set=keys).to_numpy() == np.arange(len(keys))
+    table, keys = table.filter(first), keys.filter(first)
+
+    success = pc.equal(table["status"], "SUCCESS").to_numpy()
+    metrics = {}
+    for name in metric_names:
+        # Empty cells are read as nulls, which become NaN here
+        scores = np.array(table[name].to_numpy(), dtype=np.float64)
+        scores[~success] = np.nan
+        metrics[name] = scores
+
+    # Only a handful of distinct skip lists occur, so each is split once
+    skipped = {}
+    if "skipped_metrics" in header:
+        column = table["skipped_metrics"]
+        lists = pc.unique(column)
+        codes = pc.index_in(column, value_set=lists).to_numpy()
+        for name in metric_names:
+            in_list = np.array(
+                [name in text.split(";") for text in lists.to_pylist()], dtype=bool
+            )
+            skipped[name] = in_list[codes]
+
+    scorers = [DEFAULT_SCORER]
+    if "scorer" in header and len(table):
+        scorers = sorted(
+            {
+                scorer or DEFAULT_SCORER
+                for scorer in pc.unique(table["scorer"]).to_pylist()
+            }
+        )
+    return keys, metrics, skipped, scorers
+
+
+def align(
+    baseline_keys: pa.Array, candidate_keys: pa.Array
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Row indices pairing each (product_id, question) present in both runs"""
+    positions = pc.index_in(baseline_keys, value_set=candidate_keys)
+    paired = positions.is_valid().to_numpy(zero_copy_only=False)
+    return np.flatnonzero(paired), positions.drop_null().to_numpy().astype(np.intp)
+
+
+def bootstrap_mean(
+    deltas: np.ndarray, resamples: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Bootstrap distribution of the mean delta.
+
+    Resampling n values with replacement is the same as drawing multinomial
+    counts over the distinct values, which costs O(resamples x distinct values)
+    instead of O(resamples x n).
+    """
+    rounded = np.round(deltas, DELTA_DECIMALS)
+    values, counts = np.unique(rounded, return_counts=True)
+    n = counts.sum()
+    draws = rng.multinomial(n, counts / n, size=resamples)
+    return draws @ values / n + (deltas.mean() - rounded.mean())
+
+
+def compare(
+    baseline_path: str,
+    candidate_path: str,
+    threshold: float = 0.02,
+    alpha: float = 0.05,
+    resamples: int = 2000,
+    seed: Optional[int] = 0,
+    min_paired: float = 0.95,
+    max_lost: float = 0.02,
+    min_n: int = 30,
+) -> Dict:
+    """Paired per-metric comparison of two evaluation runs.
+
+    Besides significant score drops, a run regresses when fewer than
+    ``min_paired`` of the baseline rows have a candidate row, or when a
+    metric loses more than ``max_lost`` of the scores it had in the baseline
+    (failed cases, failed judge calls or a missing column). Metrics the
+    candidate skipped on purpose are reported but not counted as lost.
+
+    Metrics with fewer than ``min_n`` paired scores are reported as
+    inconclusive instead of being tested: with a handful of deltas every
+    bootstrap resample has about the same mean, so any drop would look
+    significant.
+
+    Raises ValueError if the runs were scored by different judge
+    implementations, whose scores are not comparable.
+    """
+    baseline_keys, baseline, _, baseline_scorers = load_run(baseline_path)
+    candidate_keys, candidate, candidate_skipped, candidate_scorers = load_run(
+        candidate_path
+    )
+    if baseline_scorers != candidate_scorers or len(baseline_scorers) > 1:
+        raise ValueError(
+            f"Runs were scored differently (baseline: {', '.join(baseline_scorers)}; "
+            f"candidate: {', '.join(candidate_scorers)}); rerun one of them with "
+            f"the same --batch-size setting"
+        )
+    base_idx, cand_idx = align(baseline_keys, candidate_keys)
+    rng = np.random.default_rng(seed)
+
+    report = {
+        "baseline": baseline_path,
+        "candidate": candidate_path,
+        "baseline_rows": len(baseline_keys),
+        "candidate_rows": len(candidate_keys),
+        "paired_rows": len(base_idx),
+        "paired_fraction": (
+            len(base_idx) / len(baseline_keys) if len(baseline_keys) else 1.0
+        ),
+        "scorer": baseline_scorers[0],
+        "threshold": threshold,
+        "alpha": alpha,
+        "min_paired": min_paired,
+        "max_lost": max_lost,
+        "min_n": min_n,
+        "metrics": {},
+        "regressions": [],
+    }
+    if report["paired_fraction"] < min_paired:
+        report["regressions"].append("paired_rows")
+
+    for name in sorted(baseline):
+        before = baseline[name][base_idx]
+        if name in candidate:
+            after = candidate[name][cand_idx]
+        else:
+            after = np.full(len(cand_idx), np.nan)
+        if name in candidate_skipped:
+            skipped = candidate_skipped[name][cand_idx]
+        else:
+            skipped = np.zeros(len(cand_idx), dtype=bool)
+
+        had_score = ~np.isnan(before)
+        scored = had_score & ~np.isnan(after)
+        deltas = after[scored] - before[scored]
+        # Pairs scored in the baseline but not in the candidate
+        lost = int((had_score & np.isnan(after) & ~skipped).sum())
+        lost_rate = lost / had_score.sum() if had_score.any() else 0.0
+        entry = {
+            "n": int(scored.sum()),
+            "lost": lost,
+            "lost_rate": float(lost_rate),
+            "skipped": int((had_score & skipped).sum()),
+            "regressed": bool(lost_rate > max_lost),
+        }
+        report["metrics"][name] = entry
+        if len(deltas) == 0:
+            if entry["regressed"]:
+                report["regressions"].append(name)
+            continue
+
+        entry.update(
+            {
+                "baseline_mean": float(before[scored].mean()),
+                "candidate_mean": float(after[scored].mean()),
+                "mean_delta": float(deltas.mean()),
+                "inconclusive": len(deltas) < min_n,
+            }
+        )
+        if not entry["inconclusive"]:
+            means = bootstrap_mean(deltas, resamples, rng)
+            # Two-sided bootstrap p-value for "no change"
+            p_value = min(1.0, 2 * min((means <= 0).mean(), (means >= 0).mean()))
+            low, high = np.quantile(means, [alpha / 2, 1 - alpha / 2])
+
+            harm = entry["mean_delta"]
+            if not name.startswith(LOWER_IS_BETTER):
+                harm = -harm
+            dropped = bool(harm > threshold and p_value < alpha)
+            entry.update(
+                {
+                    "ci_low": float(low),
+                    "ci_high": float(high),
+                    "p_value": float(p_value),
+                    "dropped": dropped,
+                    "regressed": entry["regressed"] or dropped,
+                }
+            )
+        if entry["regressed"]:
+            report["regressions"].append(name)
+    return report
+
+
+def log_report(report: Dict):
+    logger.info("=" * 80)
+    logger.info(f"Baseline:  {report['baseline']} ({report['baseline_rows']} rows)")
+    logger.info(f"Candidate: {report['candidate']} ({report['candidate_rows']} rows)")
+    coverage = "ok" if "paired_rows" not in report["regressions"] else "REGRESSION"
+    logger.info(
+        f"Paired by (product_id, question): {report['paired_rows']} rows "
+        f"({report['paired_fraction']:.1%}, min {report['min_paired']:.1%}) {coverage}"
+    )
+    logger.info(f"Scorer: {report['scorer']}")
+    logger.info("=" * 80)
+    for name, entry in report["metrics"].items():
+        flag = "REGRESSION" if entry["regressed"] else "ok"
+        counts = (
+            f"n={entry['n']} lost={entry['lost']} ({entry['lost_rate']:.1%}) "
+            f"skipped={entry['skipped']}"
+        )
+        if "mean_delta" not in entry:
+            logger.info(f"{name}: no paired scores {counts} {flag}")
+            continue
+        if entry["inconclusive"]:
+            logger.info(
+                f"{name}: {entry['baseline_mean']:.4f} -> {entry['candidate_mean']:.4f} "
+                f"delta {entry['mean_delta']:+.4f} inconclusive "
+                f"(n < {report['min_n']}) {counts} {flag}"
+            )
+            continue
+        logger.info(
+            f"{name}: {entry['baseline_mean']:.4f} -> {entry['candidate_mean']:.4f} "
+            f"delta {entry['mean_delta']:+.4f} "
+            f"[{entry['ci_low']:+.4f}, {entry['ci_high']:+.4f}] "
+            f"p={entry['p_value']:.4f} {counts} {flag}"
+        )
+    logger.info("=" * 80)
+    inconclusive = [
+        name for name, entry in report["metrics"].items() if entry.get("inconclusive")
+    ]
+    if inconclusive:
+        logger.warning(f"Too few paired scores to test: {', '.join(inconclusive)}")
+    if report["regressions"]:
+        logger.error(f"Regressions: {', '.join(report['regressions'])}")
+    else:
+        logger.info("No significant regressions")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Gate a pipeline change by comparing two rag_evaluation result CSVs"
+    )
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.02,
+        help="Smallest mean score drop that counts as a regression",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument(
+        "--min-paired",
+        type=float,
+        default=0.95,
+        help="Fail if fewer than this fraction of baseline rows are paired",
+    )
+    parser.add_argument(
+        "--max-lost",
+        type=float,
+        default=0.02,
+        help="Fail if a metric loses more than this fraction of its baseline scores",
+    )
+    parser.add_argument(
+        "--min-n",
+        type=int,
+        default=30,
+        help="Report metrics with fewer paired scores as inconclusive, untested",
+    )
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    try:
+        report = compare(
+            args.baseline,
+            args.candidate,
+            threshold=args.threshold,
+            alpha=args.alpha,
+            resamples=args.resamples,
+            seed=args.seed,
+            min_paired=args.min_paired,
+            max_lost=args.max_lost,
+            min_n=args.min_n,
+        )
+    except ValueError as e:
+        logger.error(f"Cannot compare runs: {str(e)}")
+        sys.exit(2)
+    report["elapsed_seconds"] = time.perf_counter() - start
+    log_report(report)
+    logger.info(f"Compared in {report['elapsed_seconds']:.2f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
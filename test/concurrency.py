@@ -0,0 +1,252 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Error codes AWS services use to signal that a quota was exceeded
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "Throttling",
+    "TooManyRequestsException",
+    "TooManyRequests",
+    "RequestLimitExceeded",
+    "ProvisionedThroughputExceededException",
+    "ServiceQuotaExceededException",
+}
+
+# Default AIMD settings per service. Bedrock quotas are tighter than Lambda's.
+DEFAULT_SERVICE_LIMITS = {
+    "bedrock": {"initial_limit": 4, "min_limit": 1, "max_limit": 32},
+    "lambda": {"initial_limit": 2, "min_limit": 1, "max_limit": 16},
+    "api": {"initial_limit": 4, "min_limit": 1, "max_limit": 64},
+}
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Return True if the exception means the remote service throttled us."""
+    # botocore ClientError carries the AWS error code in its response
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        if code in THROTTLING_ERROR_CODES:
+            return True
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status == 429:
+            return True
+
+    # requests.HTTPError keeps the HTTP response object instead
+    status_code = getattr(response, "status_code", None)
+    if status_code == 429:
+        return True
+
+    if type(error).__name__ in THROTTLING_ERROR_CODES:
+        return True
+
+    # LangChain re-raises Bedrock errors as ValueError with the code in the text
+    message = str(error)
+    return any(code in message for code in THROTTLING_ERROR_CODES)
+
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight calls to a single service.
+
+    Every successful call raises the limit by ``increase / limit`` (about
+    ``increase`` per full window of calls); a throttled call multiplies it by
+    ``decrease_factor``. Throttles from calls started before the last cut are
+    ignored so a single burst only halves the limit once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        rate_window: float = 60.0,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.rate_window = rate_window
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._created = time.monotonic()
+        self._events: Deque[Tuple[float, str]] = deque()
+        self._totals = {"success": 0, "throttled": 0, "error": 0, "retries": 0}
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(int(self._limit), 1)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Block until a slot is free and return the call's start time."""
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._in_flight < self.limit, timeout=timeout
+            ):
+                raise TimeoutError(f"No free {self.name} slot after {timeout}s")
+            self._in_flight += 1
+            return time.monotonic()
+
+    def release(self, started_at: float, outcome: str = "success"):
+        """Free a slot and adjust the limit based on the call's outcome."""
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+
+            if outcome == "success":
+                self._limit = min(self._limit + self.increase / self._limit, self.max_limit)
+            elif outcome == "throttled" and started_at >= self._last_decrease:
+                previous = self._limit
+                self._limit = max(self._limit * self.decrease_factor, self.min_limit)
+                self._last_decrease = now
+                logger.warning(
+                    f"{self.name} throttled, concurrency limit {previous:.1f} -> {self._limit:.1f}"
+                )
+
+            self._totals[outcome] += 1
+            self._events.append((now, outcome))
+            self._trim_events(now)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the duration of the block, classifying any error."""
+        started_at = self.acquire()
+        outcome = "success"
+        try:
+            yield
+        except BaseException as e:
+            outcome = "throttled" if is_throttling_error(e) else "error"
+            raise
+        finally:
+            self.release(started_at, outcome)
+
+    def record_retry(self):
+        """Count a retried call, whether retried here or by the caller"""
+        with self._condition:
+            self._totals["retries"] += 1
+
+    def _trim_events(self, now: float):
+        cutoff = now - self.rate_window
+        while self._events and self._events[0][0] < cutoff:
+            self._events.popleft()
+
+    def rates(self) -> Dict[str, float]:
+        """Per-second success/throttle/error rates over the rate window."""
+        with self._condition:
+            now = time.monotonic()
+            self._trim_events(now)
+            counts = {"success": 0, "throttled": 0, "error": 0}
+            for _, outcome in self._events:
+                counts[outcome] += 1
+        # Early in a run only part of the window has elapsed
+        window = max(min(self.rate_window, now - self._created), 1.0)
+        return {outcome: count / window for outcome, count in counts.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        rates = self.rates()
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "success_per_sec": rates["success"],
+                "throttled_per_sec": rates["throttled"],
+                "error_per_sec": rates["error"],
+                "totals": dict(self._totals),
+            }
+
+
+class ConcurrencyController:
+    """Shared registry of per-service adaptive limiters."""
+
+    def __init__(self, service_limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self._service_limits = dict(DEFAULT_SERVICE_LIMITS)
+        self._service_limits.update(service_limits or {})
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, service: str, **settings):
+        """Override AIMD settings for a service. Resets its current limiter."""
+        with self._lock:
+            self._service_limits[service] = {
+                **self._service_limits.get(service, {}),
+                **settings,
+            }
+            self._limiters.pop(service, None)
+
+    def limiter(self, service: str) -> AdaptiveLimiter:
+        with self._lock:
+            if service not in self._limiters:
+                settings = self._service_limits.get(service, {})
+                self._limiters[service] = AdaptiveLimiter(service, **settings)
+            return self._limiters[service]
+
+    def slot(self, service: str):
+        return self.limiter(service).slot()
+
+    def call(
+        self,
+        service: str,
+        fn: Callable[..., Any],
+        *args,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        **kwargs,
+    ) -> Any:
+        """Run ``fn`` under the service's limit, retrying throttled attempts
+        with jittered exponential backoff. Other errors are raised as-is."""
+        for attempt in range(max_retries + 1):
+            try:
+                with self.slot(service):
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == max_retries:
+                    raise
+                delay = min(base_delay * 2**attempt, max_delay)
+                delay = random.uniform(delay / 2, delay)
+                logger.info(
+                    f"{service} throttled (attempt {attempt + 1}/{max_retries + 1}), retrying in {delay:.1f}s"
+                )
+                self.limiter(service).record_retry()
+                time.sleep(delay)
+
+    def max_workers(self, service: str) -> int:
+        """Upper bound for a worker pool feeding this service."""
+        return int(self.limiter(service).max_limit)
+
+    def limits(self) -> Dict[str, int]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.limit for name, limiter in limiters.items()}
+
+    def rates(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.rates() for name, limiter in limiters.items()}
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.snapshot() for name, limiter in limiters.items()}
+
+
+# Process-wide controller shared by the LLM client, evaluator and Lambda runner
+controller = ConcurrencyController()
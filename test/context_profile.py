@@ -0,0 +1,125 @@
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+from batched_metrics import CHARS_PER_TOKEN
+
+# numpy is imported inside the functions below: rag_evaluation needs the field
+# names at import time, and importing numpy there would slow down every start
+# (including --help) that never profiles a case.
+
+PIPELINES = ("with", "without")
+
+# Per-pipeline columns added to the results, next to the judge metrics
+PROFILE_FIELDS = [
+    f"context_{stat}_{pipeline}_pipeline"
+    for stat in ("count", "chars", "tokens", "duplicate_rate")
+    for pipeline in PIPELINES
+] + ["context_shared_count", "context_overlap"]
+
+# Profile columns holding whole numbers rather than rates
+COUNT_FIELDS = [
+    field
+    for field in PROFILE_FIELDS
+    if not field.startswith(("context_duplicate_rate", "context_overlap"))
+]
+
+# The API numbers chunks ("Chunk 3:\n...") per list, so the same passage can
+# carry a different label, and slightly different whitespace, in each pipeline
+_CHUNK_LABEL = re.compile(r"^\s*chunk\s+\d+\s*:\s*", re.IGNORECASE)
+
+
+def chunk_digest(chunk: Any) -> int:
+    """Identity of a context chunk, ignoring its label, case and whitespace"""
+    text = _CHUNK_LABEL.sub("", str(chunk))
+    return hash(" ".join(text.lower().split()))
+
+
+def profile_contexts(cases: Sequence[Dict[str, Any]]) -> List[Dict[str, float]]:
+    """Size and redundancy of the retrieved contexts of many cases at once.
+
+    For each pipeline: the number of chunks, their total characters and
+    estimated tokens, and the share of chunks repeating an earlier one. Across
+    pipelines: how many distinct chunks both lists share, and their overlap
+    as shared / union of distinct chunks. Only the per-chunk length and digest
+    are computed in Python; the per-case aggregation is done in bulk. A
+    missing context list counts as empty.
+    """
+    import numpy as np
+
+    groups, lengths, digests = [], [], []
+    for case_no, case in enumerate(cases):
+        for pipeline_no, pipeline in enumerate(PIPELINES):
+            group = case_no * len(PIPELINES) + pipeline_no
+            for chunk in case["contexts"].get(pipeline) or ():
+                groups.append(group)
+                lengths.append(len(str(chunk)))
+                digests.append(chunk_digest(chunk))
+
+    group_count = len(cases) * len(PIPELINES)
+    group = np.array(groups, dtype=np.int64)
+    length = np.array(lengths, dtype=np.int64)
+    digest = np.array(digests, dtype=np.int64)
+
+    count = np.bincount(group, minlength=group_count)
+    chars = np.bincount(group, weights=length, minlength=group_count)
+    tokens = np.bincount(
+        group, weights=-(-length // CHARS_PER_TOKEN), minlength=group_count
+    )
+
+    # Distinct chunks per (case, pipeline), then per case across both pipelines
+    distinct_pairs = np.unique(np.stack([group, digest], axis=1), axis=0)
+    distinct = np.bincount(distinct_pairs[:, 0], minlength=group_count)
+    case_of_pair = distinct_pairs[:, 0] // len(PIPELINES)
+    case_pairs, occurrences = np.unique(
+        np.stack([case_of_pair, distinct_pairs[:, 1]], axis=1),
+        axis=0,
+        return_counts=True,
+    )
+    shared = np.bincount(case_pairs[occurrences > 1, 0], minlength=len(cases))
+
+    duplicate_rate = np.divide(
+        count - distinct, count, out=np.zeros(group_count), where=count > 0
+    )
+    distinct_by_case = distinct.reshape(len(cases), len(PIPELINES))
+    union = distinct_by_case.sum(axis=1) - shared
+    overlap = np.divide(shared, union, out=np.zeros(len(cases)), where=union > 0)
+
+    by_pipeline = {
+        "count": count.reshape(len(cases), len(PIPELINES)),
+        "chars": chars.reshape(len(cases), len(PIPELINES)).astype(np.int64),
+        "tokens": tokens.reshape(len(cases), len(PIPELINES)).astype(np.int64),
+        "duplicate_rate": duplicate_rate.reshape(len(cases), len(PIPELINES)),
+    }
+    profiles = []
+    for case_no in range(len(cases)):
+        profile = {
+            f"context_{stat}_{pipeline}_pipeline": values[case_no, pipeline_no].item()
+            for stat, values in by_pipeline.items()
+            for pipeline_no, pipeline in enumerate(PIPELINES)
+        }
+        profile["context_shared_count"] = shared[case_no].item()
+        profile["context_overlap"] = overlap[case_no].item()
+        profiles.append(profile)
+    return profiles
+
+
+def largest_by_group(
+    keys: Sequence[str], values: Sequence[float], top: int = 5
+) -> List[Tuple[str, float, int]]:
+    """Groups with the highest mean value, as (key, mean, cases).
+
+    Rows whose value is missing (NaN or negative) are ignored.
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    present = values >= 0
+    if not present.any():
+        return []
+    names, group = np.unique(
+        np.asarray(keys, dtype=str)[present], return_inverse=True
+    )
+    sizes = np.bincount(group)
+    means = np.bincount(group, weights=values[present]) / sizes
+    order = np.argsort(-means, kind="stable")[:top]
+    return [(str(names[i]), means[i].item(), sizes[i].item()) for i in order]
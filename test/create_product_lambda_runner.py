@@ -1,13 +1,16 @@
+import argparse
+import contextlib
 import csv
 import json
-import boto3
 import time
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Optional, Tuple
 
-lambda_client = boto3.client('lambda')
-
-lambda_arn = "arn:aws:lambda:ap-south-1:703671918077:function:productanalyzer"
+from concurrency import controller, is_throttling_error
+from endpoints import get_lambda_arn, get_lambda_client
+from progress import MetricsServer, ProgressTracker, TerminalProgress
 
 file_name = "Rag Pipeline Analysis Data - Sheet1.csv"
 progress_file = "product_processing_progress.json"
@@ -69,7 +72,7 @@ def get_unique_products(data):
     
     return unique_products, product_to_indices
 
-def process_unique_product_with_retry(key: Tuple, product_data: Dict[str, Any], max_retries: int = 10, delay: float = 60.0) -> Tuple[Tuple, Optional[str]]:
+def process_unique_product_with_retry(key: Tuple, product_data: Dict[str, Any], max_retries: int = 10, delay: float = 60.0, failure_pause: float = 60.0) -> Tuple[Tuple, Optional[str]]:
     """Process a unique product with retry logic for failures."""
     
     for attempt in range(max_retries):
@@ -81,8 +84,11 @@ def process_unique_product_with_retry(key: Tuple, product_data: Dict[str, Any],
             }
             print(f"Processing unique product (attempt {attempt + 1}/{max_retries}): {lambda_payload}")
 
-            response = lambda_client.invoke(
-                FunctionName=lambda_arn,
+            # Throttled invokes are retried here and shrink the shared Lambda limit
+            response = controller.call(
+                "lambda",
+                get_lambda_client().invoke,
+                FunctionName=get_lambda_arn(),
                 InvocationType='RequestResponse',
                 Payload=json.dumps(lambda_payload)
             )
@@ -96,11 +102,12 @@ def process_unique_product_with_retry(key: Tuple, product_data: Dict[str, Any],
                 print(f"Lambda returned error (attempt {attempt + 1}): {error_message}")
                 if attempt < max_retries - 1:
                     print(f"Retrying in {delay} seconds...")
+                    controller.limiter("lambda").record_retry()
                     time.sleep(delay)
                     continue
                 else:
-                    print(f"Max retries reached for {key}. Pausing for 1 minute...")
-                    time.sleep(60)  # 1 minute pause on final failure
+                    print(f"Max retries reached for {key}. Pausing for {failure_pause} seconds...")
+                    time.sleep(failure_pause)  # pause on final failure
                     return key, None
             
             product_id = json.loads(response_payload.get('body', '{}')).get('product', {}).get('_id')
@@ -112,21 +119,30 @@ def process_unique_product_with_retry(key: Tuple, product_data: Dict[str, Any],
                 print(f"No product ID found in response for {key}")
                 if attempt < max_retries - 1:
                     print(f"Retrying in {delay} seconds...")
+                    controller.limiter("lambda").record_retry()
                     time.sleep(delay)
                     continue
                 else:
-                    print(f"Max retries reached for {key}. Pausing for 1 minute...")
-                    time.sleep(60)  # 1 minute pause on final failure
+                    print(f"Max retries reached for {key}. Pausing for {failure_pause} seconds...")
+                    time.sleep(failure_pause)  # pause on final failure
                     return key, None
                     
         except Exception as e:
             print(f"Error processing unique product {key} (attempt {attempt + 1}): {e}")
+            if is_throttling_error(e):
+                # controller.call already backed off and retried the throttled
+                # invoke; retrying again here would multiply the attempts.
+                # Raised rather than returned as None, so the product is not
+                # recorded as processed and the next run picks it up again.
+                print(f"Still throttled after backoff, leaving {key} for the next run")
+                raise
             if attempt < max_retries - 1:
                 print(f"Retrying in {delay} seconds...")
+                controller.limiter("lambda").record_retry()
                 time.sleep(delay)
             else:
-                print(f"Max retries reached for {key}. Pausing for 1 minute...")
-                time.sleep(60)  # 1 minute pause on final failure
+                print(f"Max retries reached for {key}. Pausing for {failure_pause} seconds...")
+                time.sleep(failure_pause)  # pause on final failure
                 return key, None
     
     return key, None
@@ -141,55 +157,111 @@ def write_csv_with_product_ids(file_path, data, product_ids):
             row['product_id'] = product_ids.get(i)
             writer.writerow(row)
 
-# Main execution
-data = read_csv(file_name)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create products through the analyzer Lambda")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--progress", action="store_true", help="Show a live progress view")
+    return parser.parse_args()
 
-# Get unique products and mapping to row indices
-unique_products, product_to_indices = get_unique_products(data)
-print(f"Found {len(unique_products)} unique products out of {len(data)} total rows")
+def main():
+    args = parse_args()
+    data = read_csv(file_name)
 
-# Load previous progress
-unique_product_ids, start_index = load_progress()
+    # Get unique products and mapping to row indices
+    unique_products, product_to_indices = get_unique_products(data)
+    print(f"Found {len(unique_products)} unique products out of {len(data)} total rows")
 
-# Process unique products serially with retries, starting from where we left off
-unique_products_list = list(unique_products.items())
-for i in range(start_index, len(unique_products_list)):
-    key, product_data = unique_products_list[i]
-    
-    # Skip if already processed
-    if key in unique_product_ids:
-        print(f"Skipping already processed product {i+1}/{len(unique_products_list)}: {key}")
-        continue
-    
-    print(f"Processing {i+1}/{len(unique_products_list)}: {key}")
-    key, product_id = process_unique_product_with_retry(key, product_data)
-    unique_product_ids[key] = product_id
-    
-    # Save progress after each successful processing
-    save_progress(unique_product_ids, i + 1)
-    
-    # Add a small delay between requests to avoid overwhelming the service
-    if i < len(unique_products_list) - 1:
-        time.sleep(1)
-
-# Map product IDs back to all rows
-product_ids = {}
-for key, product_id in unique_product_ids.items():
-    for index in product_to_indices[key]:
-        product_ids[index] = product_id
-
-# Write updated CSV with product IDs
-write_csv_with_product_ids(file_name, data, product_ids)
-print("Processing complete. Updated CSV saved.")
-
-# Clean up progress file on successful completion
-if os.path.exists(progress_file):
-    os.remove(progress_file)
-    print("Progress file cleaned up.")
-
-# Print summary of failed products
-failed_products = [key for key, product_id in unique_product_ids.items() if product_id is None]
-if failed_products:
-    print(f"\nFailed to process {len(failed_products)} products:")
-    for key in failed_products:
-        print(f"  - {key}")
\ No newline at end of file
+    # Load previous progress
+    unique_product_ids, _ = load_progress()
+
+    tracker = ProgressTracker("lambda_ingestion")
+
+    # Process unique products concurrently. The adaptive controller decides how many
+    # invocations are actually in flight, so the pool size is only an upper bound.
+    # Completion order is not list order, so resume by key rather than by index.
+    unique_products_list = list(unique_products.items())
+    pending = []
+    for i, (key, product_data) in enumerate(unique_products_list):
+        if key in unique_product_ids:
+            print(f"Skipping already processed product {i+1}/{len(unique_products_list)}: {key}")
+            tracker.record_cache("progress_file", hit=True)
+            continue
+        tracker.record_cache("progress_file", hit=False)
+        pending.append((key, product_data))
+    tracker.set_total(len(pending))
+
+    processed_count = len(unique_product_ids)
+    completed = 0
+    throttled = []
+    metrics_server = terminal = None
+    output = sys.stdout
+    try:
+        if args.metrics_port:
+            metrics_server = MetricsServer(tracker, args.metrics_port).start()
+        if args.progress:
+            terminal = TerminalProgress(tracker).start()
+            # Per-attempt prints would scroll a live terminal view away
+            if terminal.interactive:
+                output = open(os.devnull, 'w')
+
+        with contextlib.redirect_stdout(output), ThreadPoolExecutor(max_workers=controller.max_workers("lambda")) as executor:
+            futures = {
+                executor.submit(process_unique_product_with_retry, key, product_data): key
+                for key, product_data in pending
+            }
+            for future in as_completed(futures):
+                completed += 1
+                tracker.set_queue_depth("products", len(futures) - completed)
+                try:
+                    key, product_id = future.result()
+                except Exception as e:
+                    if not is_throttling_error(e):
+                        raise
+                    # Left out of the progress file so a rerun retries it
+                    throttled.append(futures[future])
+                    tracker.record("FAILED")
+                    continue
+                unique_product_ids[key] = product_id
+                processed_count += 1
+                tracker.record("SUCCESS" if product_id else "FAILED")
+                print(f"Processed {processed_count}/{len(unique_products_list)}: {key} (lambda limits: {controller.limits()})")
+
+                # Save progress after each completed product
+                save_progress(unique_product_ids, processed_count)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if terminal:
+            terminal.stop()
+        if metrics_server:
+            metrics_server.stop()
+
+    # Map product IDs back to all rows
+    product_ids = {}
+    for key, product_id in unique_product_ids.items():
+        for index in product_to_indices[key]:
+            product_ids[index] = product_id
+
+    # Write updated CSV with product IDs
+    write_csv_with_product_ids(file_name, data, product_ids)
+    print("Processing complete. Updated CSV saved.")
+
+    # Clean up progress file on successful completion. Throttled products are
+    # not in it, so keep it for a rerun to process only those.
+    if throttled:
+        print(f"\n{len(throttled)} products were still throttled; rerun to retry them:")
+        for key in throttled:
+            print(f"  - {key}")
+    elif os.path.exists(progress_file):
+        os.remove(progress_file)
+        print("Progress file cleaned up.")
+
+    # Print summary of failed products
+    failed_products = [key for key, product_id in unique_product_ids.items() if product_id is None]
+    if failed_products:
+        print(f"\nFailed to process {len(failed_products)} products:")
+        for key in failed_products:
+            print(f"  - {key}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+import threading
+
+# Every external endpoint the Python clients talk to, overridable from the
+# environment so the same scripts can run against mock_services.py offline.
+#
+#   PRODUCT_QUERY_API_URL        Next.js query API (with/without pipeline)
+#   PRODUCT_QUERY_DEBUG_FILE     canned API response used instead of the API
+#                                when the file exists; set to "" to disable
+#   PRODUCT_ANALYZER_LAMBDA_ARN  product ingestion Lambda
+#   PRODUCT_ANALYZER_LAMBDA      "aws" (default) or "mock" for FakeLambdaClient
+#   MOCK_LAMBDA_LATENCY_MS, MOCK_LAMBDA_ERROR_RATE, MOCK_LAMBDA_THROTTLE_RATE,
+#   MOCK_LAMBDA_MAX_CONCURRENCY  tuning for the fake Lambda
+
+DEFAULT_QUERY_API_URL = "http://localhost:3000/api/getProductQueryTest"
+DEFAULT_DEBUG_RESPONSE_FILE = "debug_api_response.json"
+DEFAULT_LAMBDA_ARN = "arn:aws:lambda:ap-south-1:703671918077:function:productanalyzer"
+
+_lambda_client = None
+_lambda_client_lock = threading.Lock()
+
+
+def get_query_api_url() -> str:
+    return os.environ.get("PRODUCT_QUERY_API_URL", DEFAULT_QUERY_API_URL)
+
+
+def get_debug_response_file() -> str:
+    return os.environ.get("PRODUCT_QUERY_DEBUG_FILE", DEFAULT_DEBUG_RESPONSE_FILE)
+
+
+def get_lambda_arn() -> str:
+    return os.environ.get("PRODUCT_ANALYZER_LAMBDA_ARN", DEFAULT_LAMBDA_ARN)
+
+
+def get_lambda_client():
+    """Return the shared Lambda client, real or fake depending on the environment.
+
+    Built on first use; boto3's default session is not thread-safe, so only one
+    worker constructs it.
+    """
+    global _lambda_client
+    with _lambda_client_lock:
+        if _lambda_client is None:
+            if os.environ.get("PRODUCT_ANALYZER_LAMBDA", "aws") == "mock":
+                from mock_services import FakeLambdaClient, MockServiceConfig
+
+                _lambda_client = FakeLambdaClient(
+                    MockServiceConfig.from_env("MOCK_LAMBDA")
+                )
+            else:
+                import boto3
+
+                _lambda_client = boto3.client("lambda")
+    return _lambda_client
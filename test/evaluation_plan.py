@@ -0,0 +1,115 @@
+import math
+import random
+from statistics import NormalDist, mean, stdev
+from typing import Dict, Iterable, List, Optional
+
+# Metrics whose score depends only on the question, reference and contexts, so a
+# without-pipeline score can be copied from the with-pipeline one when the two
+# context lists are identical. Faithfulness and noise sensitivity also read the
+# response and are only reused when the responses match as well.
+CONTEXT_ONLY_METRICS = {"context_precision", "context_recall"}
+
+
+class EvaluationPlan:
+    """Selects which metrics and test cases a run actually scores.
+
+    ``metrics`` accepts metric families (``"faithfulness"``) or full result keys
+    (``"faithfulness_with_pipeline"``); ``None`` scores everything. Setting
+    ``margin_of_error`` switches on random sampling sized so each metric mean is
+    known to within that margin at the given ``confidence``.
+    """
+
+    def __init__(
+        self,
+        metrics: Optional[Iterable[str]] = None,
+        reuse_identical_contexts: bool = True,
+        min_response_chars: int = 1,
+        margin_of_error: Optional[float] = None,
+        confidence: float = 0.95,
+        seed: Optional[int] = None,
+    ):
+        if margin_of_error is not None and margin_of_error <= 0:
+            raise ValueError(f"margin_of_error must be positive, got {margin_of_error}")
+        if not 0 < confidence < 1:
+            raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+        self.metrics = set(metrics) if metrics else None
+        self.reuse_identical_contexts = reuse_identical_contexts
+        self.min_response_chars = min_response_chars
+        self.margin_of_error = margin_of_error
+        self.confidence = confidence
+        self.seed = seed
+
+    def selects(self, key: str, metric_name: str) -> bool:
+        """Whether the plan scores this metric at all"""
+        return self.metrics is None or key in self.metrics or metric_name in self.metrics
+
+    def is_empty_response(self, response: str) -> bool:
+        """Responses this short are not worth sending to a judge"""
+        return len((response or "").strip()) < self.min_response_chars
+
+    def should_skip(self, metric_name: str, response: str) -> bool:
+        """Skip response-based metrics when there is no real response to judge"""
+        return metric_name not in CONTEXT_ONLY_METRICS and self.is_empty_response(response)
+
+    def can_reuse(
+        self,
+        metric_name: str,
+        contexts_identical: bool,
+        responses_identical: bool,
+    ) -> bool:
+        """Whether a without-pipeline score can be copied from the with-pipeline one"""
+        if not self.reuse_identical_contexts or not contexts_identical:
+            return False
+        return metric_name in CONTEXT_ONLY_METRICS or responses_identical
+
+    @property
+    def sampling(self) -> bool:
+        return self.margin_of_error is not None
+
+    def sample_size(self, population: int) -> int:
+        """Cochran sample size for a [0, 1] score with finite population correction.
+
+        Uses the worst-case variance of 0.25, so the requested margin holds for
+        any metric regardless of how its scores are distributed.
+        """
+        if not self.sampling or population <= 0:
+            return population
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        n0 = (z**2 * 0.25) / (self.margin_of_error**2)
+        n = n0 / (1 + (n0 - 1) / population)
+        return min(population, max(2, math.ceil(n)))
+
+    def select_cases(self, population: int) -> List[int]:
+        """Indices of the test cases to evaluate, in their original order"""
+        size = self.sample_size(population)
+        if size >= population:
+            return list(range(population))
+        return sorted(random.Random(self.seed).sample(range(population), size))
+
+    def confidence_intervals(
+        self,
+        columns: Dict[str, Iterable[Optional[float]]],
+        population: int,
+    ) -> Dict[str, Dict[str, float]]:
+        """Mean and confidence interval for each metric column over the scored cases"""
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        intervals = {}
+        for key, column in columns.items():
+            scores = [v for v in column if v is not None and not math.isnan(v)]
+            if not scores:
+                continue
+            center = mean(scores)
+            if len(scores) > 1:
+                # Finite population correction: sampling most of the rows
+                # leaves little uncertainty about the full-run mean
+                fpc = math.sqrt(max(population - len(scores), 0) / max(population - 1, 1))
+                half_width = z * stdev(scores) / math.sqrt(len(scores)) * fpc
+            else:
+                half_width = float("nan")
+            intervals[key] = {
+                "mean": center,
+                "low": center - half_width,
+                "high": center + half_width,
+                "n": len(scores),
+            }
+        return intervals
@@ -1,23 +1,36 @@
 import os
-import boto3
-from botocore.config import Config
+
+from concurrency import controller
 
 class NovaLLM:
     def __init__(self, model_id="us.amazon.nova-lite-v1:0"):
-        region = "us-east-1"
+        self.region = "us-east-1"
+        self.model_id = model_id
+        self._client = None
 
-        config = Config(
-            connect_timeout=3600,
-            read_timeout=3600,
-            retries={'max_attempts': 1}
-        )
+    @property
+    def client(self):
+        # boto3 and the Bedrock client are built on the first call, so creating
+        # a NovaLLM is free for runs that never reach the judge
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
 
-        self.client = boto3.client("bedrock-runtime", region_name=region, config=config)
-        self.model_id = model_id
+            config = Config(
+                connect_timeout=3600,
+                read_timeout=3600,
+                retries={'max_attempts': 1}
+            )
+
+            self._client = boto3.client("bedrock-runtime", region_name=self.region, config=config)
+        return self._client
 
     def __call__(self, prompt: str, **kwargs) -> str:
         messages = [{"role": "user", "content": [{"text": prompt}]}]
-        resp = self.client.converse(
+        # Throttled calls are retried and shrink the shared Bedrock limit
+        resp = controller.call(
+            "bedrock",
+            self.client.converse,
             modelId=self.model_id,
             messages=messages,
             inferenceConfig=kwargs.get("inferenceConfig", {"maxTokens": 256})
@@ -0,0 +1,154 @@
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from urllib.parse import urlsplit, urlunsplit
+
+from concurrency import controller
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def run_load(
+    service: str, call: Callable[[int], bool], count: int
+) -> Dict[str, float]:
+    """Drive ``call`` through a pool sized by the controller and time each call"""
+    latencies: List[float] = []
+    outcomes = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def timed(i: int):
+        start = time.perf_counter()
+        try:
+            ok = call(i)
+        except Exception:
+            ok = False
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            outcomes["ok" if ok else "failed"] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=controller.max_workers(service)) as executor:
+        list(executor.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+    return {
+        **outcomes,
+        "elapsed_s": elapsed,
+        "requests_per_sec": count / elapsed,
+        "p50_ms": percentile(0.50) * 1000,
+        "p95_ms": percentile(0.95) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+    }
+
+
+def load_api(count: int) -> Dict[str, float]:
+    """Exercise RAGEvaluator.ask_question against PRODUCT_QUERY_API_URL"""
+    # Always go over HTTP instead of reading the canned debug response
+    os.environ["PRODUCT_QUERY_DEBUG_FILE"] = ""
+    import rag_evaluation
+
+    logging.getLogger("rag_evaluation").setLevel(logging.WARNING)
+    evaluator = rag_evaluation.RAGEvaluator()
+
+    def call(i: int) -> bool:
+        response = evaluator.ask_question(f"load-{i}", "What do users report?")
+        return "with_pipeline" in response
+
+    return run_load("api", call, count)
+
+
+def load_lambda(count: int) -> Dict[str, float]:
+    """Exercise the product ingestion path against the fake Lambda"""
+    os.environ["PRODUCT_ANALYZER_LAMBDA"] = "mock"
+    from create_product_lambda_runner import process_unique_product_with_retry
+
+    def call(i: int) -> bool:
+        key = (f"Load Test Product {i}", "Electronics")
+        product_data = {"product": key[0], "product_category": key[1]}
+        _, product_id = process_unique_product_with_retry(
+            key, product_data, max_retries=3, delay=0.01, failure_pause=0
+        )
+        return product_id is not None
+
+    # The runner prints every attempt; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_load("lambda", call, count)
+
+
+def mock_api_stats() -> Dict:
+    """Server-side counters from mock_services.py, if that is what is running"""
+    import requests
+
+    from endpoints import get_query_api_url
+
+    parts = urlsplit(get_query_api_url())
+    stats_url = urlunsplit((parts.scheme, parts.netloc, "/stats", "", ""))
+    try:
+        return requests.get(stats_url, timeout=5).json()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test the query API and Lambda ingestion clients offline"
+    )
+    parser.add_argument("target", choices=["api", "lambda"])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument(
+        "--max-limit",
+        type=int,
+        help="Upper bound on the adaptive concurrency limit for the target",
+    )
+    parser.add_argument("--initial-limit", type=int)
+    args = parser.parse_args()
+
+    settings = {}
+    if args.max_limit is not None:
+        settings["max_limit"] = args.max_limit
+    if args.initial_limit is not None:
+        settings["initial_limit"] = args.initial_limit
+    if settings:
+        controller.configure(args.target, **settings)
+
+    if args.target == "api":
+        report = load_api(args.requests)
+        server_stats = mock_api_stats()
+    else:
+        report = load_lambda(args.requests)
+        from endpoints import get_lambda_client
+
+        server_stats = get_lambda_client().stats()
+
+    logger.info(f"Load test ({args.target}, {args.requests} requests)")
+    logger.info(
+        f"  ok={report['ok']} failed={report['failed']} "
+        f"elapsed={report['elapsed_s']:.2f}s rate={report['requests_per_sec']:.1f}/s"
+    )
+    logger.info(
+        f"  latency p50={report['p50_ms']:.1f}ms p95={report['p95_ms']:.1f}ms "
+        f"p99={report['p99_ms']:.1f}ms"
+    )
+    logger.info(f"  controller: {controller.snapshot().get(args.target)}")
+    logger.info(f"  server: {server_stats}")
+    sys.exit(0 if report["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PAYLOAD_FILE = os.path.join(HERE, "debug_api_response.json")
+
+
+class MockServiceConfig:
+    """Latency and failure profile for a mock service.
+
+    Each request first checks ``max_concurrency`` (throttled when exceeded, like
+    an account quota), then is throttled with ``throttle_rate`` probability or
+    fails with ``error_rate`` probability, and otherwise succeeds after
+    ``latency_ms`` +/- ``latency_jitter_ms``.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        max_concurrency: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_concurrency = max_concurrency
+        self.seed = seed
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "MockServiceConfig":
+        """Read settings such as ``MOCK_LAMBDA_LATENCY_MS`` from the environment"""
+
+        def read(name, cast, default):
+            value = os.environ.get(f"{prefix}_{name}")
+            return cast(value) if value not in (None, "") else default
+
+        return cls(
+            latency_ms=read("LATENCY_MS", float, 50.0),
+            latency_jitter_ms=read("LATENCY_JITTER_MS", float, 0.0),
+            error_rate=read("ERROR_RATE", float, 0.0),
+            throttle_rate=read("THROTTLE_RATE", float, 0.0),
+            max_concurrency=read("MAX_CONCURRENCY", int, None),
+            seed=read("SEED", int, None),
+        )
+
+
+class MockBehaviour:
+    """Decides each request's outcome and keeps request statistics"""
+
+    def __init__(self, config: MockServiceConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._started = time.monotonic()
+        self._counts = {"ok": 0, "error": 0, "throttled": 0}
+
+    def begin(self) -> str:
+        """Admit a request and return its outcome: ok, error or throttled"""
+        with self._lock:
+            limit = self.config.max_concurrency
+            if limit is not None and self._in_flight >= limit:
+                outcome = "throttled"
+            else:
+                roll = self._rng.random()
+                if roll < self.config.throttle_rate:
+                    outcome = "throttled"
+                elif roll < self.config.throttle_rate + self.config.error_rate:
+                    outcome = "error"
+                else:
+                    outcome = "ok"
+            self._counts[outcome] += 1
+            if outcome != "throttled":
+                self._in_flight += 1
+            return outcome
+
+    def end(self, outcome: str):
+        if outcome != "throttled":
+            with self._lock:
+                self._in_flight -= 1
+
+    def latency(self) -> float:
+        """Latency for the next request, in seconds"""
+        with self._lock:
+            jitter = self._rng.uniform(
+                -self.config.latency_jitter_ms, self.config.latency_jitter_ms
+            )
+        return max(self.config.latency_ms + jitter, 0.0) / 1000
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            total = sum(self._counts.values())
+            return {
+                **self._counts,
+                "total": total,
+                "in_flight": self._in_flight,
+                "requests_per_sec": total / elapsed if elapsed else 0.0,
+            }
+
+
+class TooManyRequestsException(Exception):
+    """Mirrors the botocore error Lambda raises when concurrency is exhausted"""
+
+    def __init__(self, message: str = "Rate Exceeded."):
+        super().__init__(message)
+        self.response = {
+            "Error": {"Code": "TooManyRequestsException", "Message": message},
+            "ResponseMetadata": {"HTTPStatusCode": 429},
+        }
+
+
+class FakeLambdaClient:
+    """Stand-in for ``boto3.client("lambda")`` serving the product analyzer"""
+
+    def __init__(self, config: Optional[MockServiceConfig] = None):
+        self.behaviour = MockBehaviour(config or MockServiceConfig())
+
+    def invoke(
+        self,
+        FunctionName: str,
+        InvocationType: str = "RequestResponse",
+        Payload: str = "{}",
+        **kwargs,
+    ) -> Dict[str, Any]:
+        outcome = self.behaviour.begin()
+        if outcome == "throttled":
+            raise TooManyRequestsException()
+
+        try:
+            time.sleep(self.behaviour.latency())
+            request = json.loads(Payload or "{}")
+            if outcome == "error":
+                response = {
+                    "statusCode": 500,
+                    "body": json.dumps({"error": "Mock Lambda failure"}),
+                }
+            else:
+                product = {
+                    "_id": uuid.uuid4().hex[:24],
+                    "name": request.get("product_name"),
+                    "category": request.get("product_category"),
+                }
+                response = {"statusCode": 200, "body": json.dumps({"product": product})}
+        finally:
+            self.behaviour.end(outcome)
+
+        return {
+            "StatusCode": 200,
+            "Payload": BytesIO(json.dumps(response).encode("utf-8")),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return self.behaviour.stats()
+
+
+def load_query_payload(payload_file: str = DEFAULT_PAYLOAD_FILE) -> bytes:
+    """Encoded response body for the query API, from a captured response if present"""
+    if os.path.exists(payload_file):
+        with open(payload_file, "rb") as f:
+            return f.read()
+
+    contexts = [f"Mock review snippet {i} about the product." for i in range(20)]
+    payload = {
+        "with_pipeline": {
+            "ai_response": "Mock answer generated with the retrieval pipeline.",
+            "context_with_pipeline": contexts,
+        },
+        "without_pipeline": {
+            "ai_response": "Mock answer generated without the retrieval pipeline.",
+            "context_without_pipeline": contexts[:10],
+        },
+        "meta": {"standaloneQuery": "", "subqueries": [], "hypotheticalAnswers": []},
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def create_app(config: MockServiceConfig, payload_file: str = DEFAULT_PAYLOAD_FILE):
+    """aiohttp app mimicking the Next.js ``/api/getProductQueryTest`` route"""
+    from aiohttp import web
+
+    behaviour = MockBehaviour(config)
+    body = load_query_payload(payload_file)
+
+    async def get_product_query_test(request):
+        outcome = behaviour.begin()
+        if outcome == "throttled":
+            return web.json_response({"error": "TooManyRequests"}, status=429)
+        try:
+            await request.read()
+            await asyncio.sleep(behaviour.latency())
+            if outcome == "error":
+                return web.json_response({"error": "Mock API failure"}, status=500)
+            return web.Response(body=body, content_type="application/json")
+        finally:
+            behaviour.end(outcome)
+
+    async def stats(request):
+        return web.json_response(behaviour.stats())
+
+    app = web.Application()
+    app.router.add_post("/api/getProductQueryTest", get_product_query_test)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the product query API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--payload-file", default=DEFAULT_PAYLOAD_FILE)
+    args = parser.parse_args()
+
+    from aiohttp import web
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    config = MockServiceConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_concurrency=args.max_concurrency,
+        seed=args.seed,
+    )
+    logger.info(
+        f"Mock query API on http://{args.host}:{args.port}/api/getProductQueryTest "
+        f"(stats at /stats)"
+    )
+    web.run_app(
+        create_app(config, args.payload_file),
+        host=args.host,
+        port=args.port,
+        access_log=None,
+    )
+
+
+if __name__ == "__main__":
+    main()
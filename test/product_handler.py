@@ -1,10 +1,6 @@
 import requests
 from pprint import pprint
-from ragas import SingleTurnSample
-from ragas.metrics import IDBasedContextPrecision
-from ragas.metrics import Faithfulness
-from ragas.llms import llm_factory
-from llm_client import NovaLLM 
+from endpoints import get_query_api_url
 
 
 cookies = {
@@ -40,51 +36,63 @@ def ask_question(product_id, question):
         'productId': product_id,
     }
 
-    response = requests.post('http://localhost:3000/api/getProductQueryTest', cookies=cookies, headers=headers, json=json_data)
+    response = requests.post(get_query_api_url(), cookies=cookies, headers=headers, json=json_data)
     return response.json()
 
 
-question = 'What performance issues do users commonly report with the S24 Ultra?'
-product_id = '69332bdf5e415a34a70d0855'
+def main():
+    # ragas and the Bedrock client are slow to load, so only pay for them when
+    # the script is run rather than when ask_question is imported
+    from ragas import SingleTurnSample
+    from ragas.metrics import Faithfulness
+    from ragas.llms import llm_factory
+    from llm_client import NovaLLM
 
-# 1. api call krna hai
-response = ask_question(product_id, question)
+    question = 'What performance issues do users commonly report with the S24 Ultra?'
+    product_id = '69332bdf5e415a34a70d0855'
 
-with_pipeline = response.get('with_pipeline')
-with_pipeline_ai_response = with_pipeline.get('ai_response')
-context_with_pipeline = with_pipeline.get('context_with_pipeline')
+    # 1. api call krna hai
+    response = ask_question(product_id, question)
 
-without_pipeline = response.get('without_pipeline')
-without_pipeline_ai_response = without_pipeline.get('ai_response')
-context_without_pipeline = without_pipeline.get('context_without_pipeline')
+    with_pipeline = response.get('with_pipeline')
+    with_pipeline_ai_response = with_pipeline.get('ai_response')
+    context_with_pipeline = with_pipeline.get('context_with_pipeline')
 
-print(response)
+    without_pipeline = response.get('without_pipeline')
+    without_pipeline_ai_response = without_pipeline.get('ai_response')
+    context_without_pipeline = without_pipeline.get('context_without_pipeline')
 
-#create client
-novallm = NovaLLM()              # create instance
-llm = llm_factory("nova-lite", client=novallm)
+    print(response)
 
-# 4 matrix me yeh sab chize input dalna for ex. 
-# Initialize the faithfulness metric
-faithfulness = Faithfulness()
+    #create client
+    novallm = NovaLLM()              # create instance
+    llm = llm_factory("nova-lite", client=novallm)
 
-# Create SingleTurnSample for with_pipeline
-with_pipeline_sample = SingleTurnSample(
-    user_input=question,
-    response=with_pipeline_ai_response,
-    retrieved_contexts=context_with_pipeline
-)
+    # 4 matrix me yeh sab chize input dalna for ex. 
+    # Initialize the faithfulness metric
+    faithfulness = Faithfulness()
 
-# Create SingleTurnSample for without_pipeline
-without_pipeline_sample = SingleTurnSample(
-    user_input=question,
-    response=without_pipeline_ai_response,
-    retrieved_contexts=context_without_pipeline
-)
+    # Create SingleTurnSample for with_pipeline
+    with_pipeline_sample = SingleTurnSample(
+        user_input=question,
+        response=with_pipeline_ai_response,
+        retrieved_contexts=context_with_pipeline
+    )
 
-# Evaluate faithfulness for both samples
-with_pipeline_faithfulness = faithfulness.single_turn_score(with_pipeline_sample)
-without_pipeline_faithfulness = faithfulness.single_turn_score(without_pipeline_sample)
+    # Create SingleTurnSample for without_pipeline
+    without_pipeline_sample = SingleTurnSample(
+        user_input=question,
+        response=without_pipeline_ai_response,
+        retrieved_contexts=context_without_pipeline
+    )
 
-print(f"Faithfulness with pipeline: {with_pipeline_faithfulness}")
-print(f"Faithfulness without pipeline: {without_pipeline_faithfulness}")
\ No newline at end of file
+    # Evaluate faithfulness for both samples
+    with_pipeline_faithfulness = faithfulness.single_turn_score(with_pipeline_sample)
+    without_pipeline_faithfulness = faithfulness.single_turn_score(without_pipeline_sample)
+
+    print(f"Faithfulness with pipeline: {with_pipeline_faithfulness}")
+    print(f"Faithfulness without pipeline: {without_pipeline_faithfulness}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Optional
+
+from concurrency import ConcurrencyController, controller
+
+logger = logging.getLogger(__name__)
+
+# Completions older than this no longer count toward the current rate
+RATE_WINDOW_SECONDS = 300.0
+
+
+class ProgressTracker:
+    """Thread-safe progress counters for one long-running job.
+
+    Tracks completed cases by status, a rolling completion rate, named cache
+    hit/miss counters and arbitrary per-stage queue depths. Per-service
+    in-flight requests, limits and retries come from the concurrency
+    controller so they need no extra bookkeeping in the callers.
+    """
+
+    def __init__(
+        self,
+        job: str,
+        total: int = 0,
+        concurrency: Optional[ConcurrencyController] = None,
+    ):
+        self.job = job
+        self.total = total
+        self.concurrency = concurrency or controller
+        self._started = time.monotonic()
+        self._completions: Deque[float] = deque()
+        self._status: Dict[str, int] = {}
+        self._cache: Dict[str, Dict[str, int]] = {}
+        self._queues: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def set_total(self, total: int):
+        with self._lock:
+            self.total = total
+
+    def record(self, status: str):
+        """Count one finished case with its status (SUCCESS, FAILED, ...)"""
+        with self._lock:
+            now = time.monotonic()
+            self._status[status] = self._status.get(status, 0) + 1
+            self._completions.append(now)
+            cutoff = now - RATE_WINDOW_SECONDS
+            while self._completions and self._completions[0] < cutoff:
+                self._completions.popleft()
+
+    def record_cache(self, cache: str, hit: bool):
+        with self._lock:
+            counts = self._cache.setdefault(cache, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def set_queue_depth(self, stage: str, depth: int):
+        with self._lock:
+            self._queues[stage] = depth
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._started
+            completed = sum(self._status.values())
+            window = max(min(RATE_WINDOW_SECONDS, elapsed), 1.0)
+            recent = sum(1 for t in self._completions if t >= now - window)
+            per_minute = recent / window * 60
+            remaining = max(self.total - completed, 0)
+            eta = remaining / per_minute * 60 if per_minute else None
+            snapshot = {
+                "job": self.job,
+                "total": self.total,
+                "completed": completed,
+                "status": dict(self._status),
+                "elapsed_seconds": elapsed,
+                "cases_per_minute": per_minute,
+                "eta_seconds": eta,
+                "cache": {name: dict(counts) for name, counts in self._cache.items()},
+                "queues": dict(self._queues),
+            }
+        snapshot["services"] = self.concurrency.snapshot()
+        return snapshot
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus(snapshot: Dict) -> str:
+    """Render a tracker snapshot in the Prometheus text exposition format"""
+    # "job" is reserved for the scrape target, so the label is called "run"
+    run = snapshot["job"]
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+    metric(
+        "rag_cases_planned",
+        "gauge",
+        "Cases planned for the run.",
+        [({"run": run}, snapshot["total"])],
+    )
+    metric(
+        "rag_cases_completed_total",
+        "counter",
+        "Finished cases by status.",
+        [({"run": run, "status": s}, n) for s, n in snapshot["status"].items()],
+    )
+    metric(
+        "rag_cases_per_minute",
+        "gauge",
+        "Recent case completion rate.",
+        [({"run": run}, round(snapshot["cases_per_minute"], 3))],
+    )
+    eta = snapshot["eta_seconds"]
+    metric(
+        "rag_eta_seconds",
+        "gauge",
+        "Projected seconds until all cases finish (NaN while unknown).",
+        [({"run": run}, "NaN" if eta is None else round(eta, 1))],
+    )
+    metric(
+        "rag_queue_depth",
+        "gauge",
+        "Items waiting per stage.",
+        [({"run": run, "stage": q}, n) for q, n in snapshot["queues"].items()],
+    )
+
+    services = snapshot["services"]
+    metric(
+        "rag_inflight_requests",
+        "gauge",
+        "Requests currently in flight per service.",
+        [({"run": run, "service": s}, v["in_flight"]) for s, v in services.items()],
+    )
+    metric(
+        "rag_concurrency_limit",
+        "gauge",
+        "Current adaptive concurrency limit per service.",
+        [({"run": run, "service": s}, v["limit"]) for s, v in services.items()],
+    )
+    metric(
+        "rag_requests_total",
+        "counter",
+        "Requests per service by outcome.",
+        [
+            ({"run": run, "service": s, "outcome": outcome}, v["totals"][outcome])
+            for s, v in services.items()
+            for outcome in ("success", "throttled", "error")
+        ],
+    )
+    metric(
+        "rag_retries_total",
+        "counter",
+        "Retried requests per service.",
+        [
+            ({"run": run, "service": s}, v["totals"]["retries"])
+            for s, v in services.items()
+        ],
+    )
+
+    cache = snapshot["cache"]
+    metric(
+        "rag_cache_hits_total",
+        "counter",
+        "Cache hits by cache.",
+        [({"run": run, "cache": c}, v["hits"]) for c, v in cache.items()],
+    )
+    metric(
+        "rag_cache_misses_total",
+        "counter",
+        "Cache misses by cache.",
+        [({"run": run, "cache": c}, v["misses"]) for c, v in cache.items()],
+    )
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves ``/metrics`` for a tracker on a background thread"""
+
+    def __init__(self, tracker: ProgressTracker, port: int, host: str = "127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus(tracker.snapshot()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        logger.info(f"Metrics endpoint at http://{host}:{port}/metrics")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_progress(snapshot: Dict) -> str:
+    """Multi-line human-readable view of a tracker snapshot"""
+    total, completed = snapshot["total"], snapshot["completed"]
+    fraction = completed / total if total else 0.0
+    bar = "#" * int(fraction * 30)
+    status = " ".join(f"{s.lower()}={n}" for s, n in sorted(snapshot["status"].items()))
+    lines = [
+        f"{snapshot['job']} [{bar:<30}] {completed}/{total} ({fraction:.0%})  {status}",
+        f"  rate {snapshot['cases_per_minute']:.1f} cases/min  "
+        f"elapsed {_duration(snapshot['elapsed_seconds'])}  "
+        f"eta {_duration(snapshot['eta_seconds'])}",
+    ]
+    for service, stats in sorted(snapshot["services"].items()):
+        totals = stats["totals"]
+        lines.append(
+            f"  {service:<8} in-flight {stats['in_flight']:>3}/{stats['limit']:<3} "
+            f"ok {stats['success_per_sec']:.2f}/s  throttled {totals['throttled']}  "
+            f"errors {totals['error']}  retries {totals['retries']}"
+        )
+    for cache, counts in sorted(snapshot["cache"].items()):
+        lookups = counts["hits"] + counts["misses"]
+        ratio = counts["hits"] / lookups if lookups else 0.0
+        lines.append(f"  cache {cache}: {ratio:.0%} hits ({counts['hits']}/{lookups})")
+    for stage, depth in sorted(snapshot["queues"].items()):
+        lines.append(f"  queue {stage}: {depth}")
+    return "\n".join(lines)
+
+
+class TerminalProgress:
+    """Redraws the progress view on a TTY, or prints it periodically otherwise"""
+
+    def __init__(
+        self,
+        tracker: ProgressTracker,
+        interval: float = 1.0,
+        log_interval: float = 30.0,
+        stream=None,
+    ):
+        self.tracker = tracker
+        self.stream = stream or sys.stderr
+        self.interactive = self.stream.isatty()
+        self.interval = interval if self.interactive else log_interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._lines_drawn = 0
+
+    def start(self) -> "TerminalProgress":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._draw()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._draw()
+
+    def _draw(self):
+        view = format_progress(self.tracker.snapshot())
+        # On a TTY, move back over the previous view and clear it before
+        # redrawing; elsewhere (log files, CI) just append a new snapshot
+        if self.interactive and self._lines_drawn:
+            self.stream.write(f"\x1b[{self._lines_drawn}F\x1b[J")
+        self.stream.write(view + "\n")
+        self.stream.flush()
+        self._lines_drawn = view.count("\n") + 1
@@ -1,22 +1,29 @@
-import csv
+import argparse
 import json
 import logging
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from importlib import import_module
 from pprint import pprint
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import requests
-from langchain_aws import BedrockEmbeddings, ChatBedrock
-from ragas import SingleTurnSample
-from ragas.embeddings.base import LangchainEmbeddingsWrapper
-from ragas.llms import LangchainLLMWrapper
-from ragas.metrics import (
-    ContextPrecision,
-    ContextRecall,
-    Faithfulness,
-    NoiseSensitivity,
+
+from batched_metrics import BatchedJudge, BatchedMetricExecutor
+from case_file import CaseFile
+from concurrency import controller
+from context_profile import (
+    COUNT_FIELDS,
+    PROFILE_FIELDS,
+    largest_by_group,
+    profile_contexts,
 )
+from endpoints import get_debug_response_file, get_query_api_url
+from evaluation_plan import EvaluationPlan
+from progress import MetricsServer, ProgressTracker, TerminalProgress
+from results_store import ResultStore
 
 # Configure logging
 logging.basicConfig(
@@ -53,67 +60,251 @@ headers = {
     "sec-ch-ua-platform": '"Windows"',
 }
 
+# (result key, log label, metric attribute, pipeline sample)
+METRIC_SPECS = [
+    (
+        "context_precision_with_pipeline",
+        "Context Precision (with pipeline)",
+        "context_precision",
+        "with",
+    ),
+    (
+        "context_precision_without_pipeline",
+        "Context Precision (without pipeline)",
+        "context_precision",
+        "without",
+    ),
+    (
+        "context_recall_with_pipeline",
+        "Context Recall (with pipeline)",
+        "context_recall",
+        "with",
+    ),
+    (
+        "context_recall_without_pipeline",
+        "Context Recall (without pipeline)",
+        "context_recall",
+        "without",
+    ),
+    (
+        "faithfulness_with_pipeline",
+        "Faithfulness (with pipeline)",
+        "faithfulness",
+        "with",
+    ),
+    (
+        "faithfulness_without_pipeline",
+        "Faithfulness (without pipeline)",
+        "faithfulness",
+        "without",
+    ),
+    (
+        "noise_sensitivity_with_pipeline",
+        "Noise Sensitivity (with pipeline)",
+        "noise_sensitivity",
+        "with",
+    ),
+]
+
+# Names accepted by --metrics: metric families, then individual result keys
+METRIC_NAMES = list(dict.fromkeys(attr for _, _, attr, _ in METRIC_SPECS)) + [
+    key for key, _, _, _ in METRIC_SPECS
+]
+
+# Output token budget of the Bedrock judge, shared by batched prompts
+JUDGE_MAX_TOKENS = 4096
+
+# Value of the results "scorer" column, which compare_runs checks before
+# comparing two runs. Batched runs send the same RAGAS prompts and use the same
+# scoring as one-sample-at-a-time runs, so both are "ragas".
+SCORER = "ragas"
+
+# Columns of the results CSV
+RESULT_FIELDS = (
+    ["test_case_index", "product_id", "question", "ground_truth"]
+    + [key for key, _, _, _ in METRIC_SPECS]
+    + ["scorer"]
+    + PROFILE_FIELDS
+    + ["status", "error_message", "skipped_metrics"]
+)
+
+# RAGAS metric class backing each metric attribute. langchain_aws and ragas take
+# several seconds to import, so they are only loaded once a judge or metric is
+# actually needed (see RAGEvaluator._backend and RAGEvaluator.metric).
+METRIC_CLASSES = {
+    "context_precision": "ContextPrecision",
+    "context_recall": "ContextRecall",
+    "faithfulness": "Faithfulness",
+    "noise_sensitivity": "NoiseSensitivity",
+}
+
+
+class JudgeInitializationError(RuntimeError):
+    """The Bedrock judge could not be set up, so no case can be scored"""
+
 
 class RAGEvaluator:
-    def __init__(self):
+    def __init__(self, plan: Optional[EvaluationPlan] = None, batch_size: int = 1):
         logger.info("Initializing RAG Evaluator...")
+        self.plan = plan or EvaluationPlan()
+        # Test cases scored together; above 1, supported metrics are judged
+        # with multi-item prompts across the whole group
+        self.batch_size = max(batch_size, 1)
+        self.progress = ProgressTracker("evaluation")
+
+        # Judge backends and metrics are built on first use. Metric scoring runs
+        # on worker threads, so construction is guarded by a lock.
+        self._init_lock = threading.Lock()
+        self._llm = None
+        self._chat = None
+        self._embeddings = None
+        self._batched_executor = None
+        self._backend_error: Optional[JudgeInitializationError] = None
+        self._metrics: Dict[str, Any] = {}
+        self._local = threading.local()
+
+    def _backend(self):
+        """Import and construct the Bedrock judge and embeddings once.
+
+        A failure is remembered and raised again on every later call, so a
+        misconfigured run stops instead of retrying the setup for each case.
+        """
+        with self._init_lock:
+            if self._backend_error is not None:
+                raise self._backend_error
+            if self._llm is not None:
+                return
 
-        try:
-            # Initialize Bedrock configuration
-            config = {
-                "credentials_profile_name": "default",  # Use default AWS profile
-                "region_name": "us-east-1",  # Nova Lite region
-                "model_id": "us.amazon.nova-lite-v1:0",  # Nova Lite model ID
-                "model_kwargs": {
-                    "temperature": 0.1,
-                    "max_tokens": 4096,
-                },  # Low temperature for consistent evaluation and high max_tokens for complete JSON
-            }
+            try:
+                from botocore.config import Config
+                from langchain_aws import BedrockEmbeddings, ChatBedrock
+                from ragas.embeddings.base import LangchainEmbeddingsWrapper
+                from ragas.llms import LangchainLLMWrapper
+                from ragas.run_config import RunConfig
+
+                # Initialize Bedrock configuration
+                config = {
+                    "credentials_profile_name": "default",  # Use default AWS profile
+                    "region_name": "us-east-1",  # Nova Lite region
+                    "model_id": "us.amazon.nova-lite-v1:0",  # Nova Lite model ID
+                    "model_kwargs": {
+                        "temperature": 0.1,
+                        "max_tokens": JUDGE_MAX_TOKENS,
+                    },  # Low temperature for consistent evaluation and high max_tokens for complete JSON
+                }
 
-            # Initialize ChatBedrock
-            logger.info("Initializing ChatBedrock with Nova Lite (high max_tokens)...")
-            bedrock_llm = ChatBedrock(
-                model=config["model_id"],
-                region=config["region_name"],
-                credentials_profile_name=config["credentials_profile_name"],
-                model_kwargs=config["model_kwargs"],
-            )
+                # Initialize ChatBedrock. botocore must not retry throttled
+                # calls itself (total_max_attempts counts the first attempt),
+                # so throttles reach the shared controller, which backs off
+                # and lowers the Bedrock concurrency limit.
+                logger.info(
+                    "Initializing ChatBedrock with Nova Lite (high max_tokens)..."
+                )
+                bedrock_llm = ChatBedrock(
+                    model=config["model_id"],
+                    region=config["region_name"],
+                    credentials_profile_name=config["credentials_profile_name"],
+                    model_kwargs=config["model_kwargs"],
+                    config=Config(retries={"total_max_attempts": 1}),
+                )
 
-            # Initialize Bedrock embeddings
-            bedrock_embeddings = BedrockEmbeddings(
-                credentials_profile_name=config["credentials_profile_name"],
-                region_name=config["region_name"],
-                model_id="amazon.titan-embed-text-v1",  # Default embedding model
+                # Initialize Bedrock embeddings
+                bedrock_embeddings = BedrockEmbeddings(
+                    credentials_profile_name=config["credentials_profile_name"],
+                    region_name=config["region_name"],
+                    model_id="amazon.titan-embed-text-v1",  # Default embedding model
+                )
+
+                # Wrap with RAGAS wrappers for proper integration
+                logger.info("Wrapping models with RAGAS wrappers...")
+                self._chat = bedrock_llm
+                self._embeddings = LangchainEmbeddingsWrapper(bedrock_embeddings)
+                # RAGAS retries every failed judge call up to 10 times by
+                # default; a single attempt leaves retrying to the controller
+                self._llm = LangchainLLMWrapper(
+                    bedrock_llm, run_config=RunConfig(max_retries=1)
+                )
+
+                logger.info("Bedrock judge initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize Bedrock judge: {str(e)}")
+                logger.error("Make sure your AWS credentials are configured properly")
+                logger.error("Run 'aws configure' to set up your credentials")
+                self._backend_error = JudgeInitializationError(
+                    f"Failed to initialize Bedrock judge: {str(e)}"
+                )
+                raise self._backend_error from e
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._backend()
+        return self._llm
+
+    @property
+    def embeddings(self):
+        if self._llm is None:
+            self._backend()
+        return self._embeddings
+
+    @property
+    def batched_executor(self) -> BatchedMetricExecutor:
+        if self._batched_executor is None:
+            self._backend()
+            judge = BatchedJudge(
+                lambda prompt: self._chat.invoke(prompt).content,
+                max_tokens=JUDGE_MAX_TOKENS,
             )
+            self._batched_executor = BatchedMetricExecutor(judge, self.metric)
+        return self._batched_executor
+
+    def metric(self, name: str):
+        """Return the RAGAS metric for an attribute name, building it on first use"""
+        if name not in self._metrics:
+            llm = self.llm
+            with self._init_lock:
+                if name not in self._metrics:
+                    logger.info(f"Initializing RAGAS metric {METRIC_CLASSES[name]}...")
+                    metric_class = getattr(
+                        import_module("ragas.metrics"), METRIC_CLASSES[name]
+                    )
+                    self._metrics[name] = metric_class(llm=llm)
+        return self._metrics[name]
 
-            # Wrap with RAGAS wrappers for proper integration
-            logger.info("Wrapping models with RAGAS wrappers...")
-            self.llm = LangchainLLMWrapper(bedrock_llm)
-            self.embeddings = LangchainEmbeddingsWrapper(bedrock_embeddings)
+    @property
+    def context_precision(self):
+        return self.metric("context_precision")
 
-            # Initialize RAGAS metrics with wrapped LLM
-            logger.info("Initializing RAGAS metrics...")
-            self.context_precision = ContextPrecision(llm=self.llm)
-            self.context_recall = ContextRecall(llm=self.llm)
-            self.faithfulness = Faithfulness(llm=self.llm)
-            self.noise_sensitivity = NoiseSensitivity(llm=self.llm)
+    @property
+    def context_recall(self):
+        return self.metric("context_recall")
 
-            logger.info("RAG Evaluator initialized successfully with Bedrock")
-        except Exception as e:
-            logger.error(f"Failed to initialize RAG Evaluator: {str(e)}")
-            logger.error("Make sure your AWS credentials are configured properly")
-            logger.error("Run 'aws configure' to set up your credentials")
-            raise
+    @property
+    def faithfulness(self):
+        return self.metric("faithfulness")
+
+    @property
+    def noise_sensitivity(self):
+        return self.metric("noise_sensitivity")
+
+    def _session(self) -> requests.Session:
+        """Per-thread HTTP session so concurrent API calls reuse connections"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
 
     def ask_question(self, product_id: str, question: str) -> Dict[str, Any]:
         """Call the API to get both pipeline and non-pipeline responses"""
-        # For testing, use debug JSON file
-        try:
-            with open("debug_api_response.json", "r") as f:
-                logger.info("Using debug API response file")
-                return json.load(f)
-        except FileNotFoundError:
-            logger.info("Debug file not found, calling live API")
+        # For testing, use debug JSON file (PRODUCT_QUERY_DEBUG_FILE="" disables it)
+        debug_file = get_debug_response_file()
+        if debug_file:
+            try:
+                with open(debug_file, "r") as f:
+                    logger.info("Using debug API response file")
+                    return json.load(f)
+            except FileNotFoundError:
+                logger.info("Debug file not found, calling live API")
 
         try:
             json_data = {
@@ -121,20 +312,34 @@ class RAGEvaluator:
                 "productId": product_id,
             }
 
+            def post():
+                response = self._session().post(
+                    get_query_api_url(),
+                    cookies=cookies,
+                    headers=headers,
+                    json=json_data,
+                    timeout=60,
+                )
+                response.raise_for_status()
+                return response.json()
+
             logger.info(f"Calling API with query: {question[:50]}...")
-            response = requests.post(
-                "http://localhost:3000/api/getProductQueryTest",
-                cookies=cookies,
-                headers=headers,
-                json=json_data,
-                timeout=60,
-            )
-            response.raise_for_status()
-            return response.json()
+            return controller.call("api", post)
         except requests.exceptions.RequestException as e:
             logger.error(f"API call failed for product {product_id}: {str(e)}")
             raise
 
+    def _score_metric(self, label: str, metric: Any, sample: Any):
+        """Score a single metric, returning None if it fails"""
+        try:
+            logger.info(f"Calculating {label}...")
+            score = controller.call("bedrock", metric.single_turn_score, sample)
+            logger.info(f"✓ {label}: {score:.4f}")
+            return score
+        except Exception as e:
+            logger.error(f"✗ {label} failed: {str(e)[:200]}...")
+            return None
+
     def evaluate_metrics(
         self,
         user_query: str,
@@ -144,178 +349,339 @@ class RAGEvaluator:
         without_pipeline_response: str,
         context_without_pipeline: List[str],
     ) -> Dict[str, Any]:
-        """Calculate all metrics for both pipeline and non-pipeline responses with error handling"""
-
-        metrics = {}
-
-        # Create samples for with_pipeline
-        with_pipeline_sample = SingleTurnSample(
-            user_input=user_query,
-            response=with_pipeline_response,
-            retrieved_contexts=context_with_pipeline,
-            reference=ground_truth,
+        """Calculate the planned metrics for both pipeline and non-pipeline responses with error handling"""
+        case = {
+            "question": user_query,
+            "reference": ground_truth,
+            "responses": {
+                "with": with_pipeline_response,
+                "without": without_pipeline_response,
+            },
+            "contexts": {
+                "with": context_with_pipeline,
+                "without": context_without_pipeline,
+            },
+        }
+        return self.evaluate_metrics_batch([case])[0]
+
+    def _plan_case(self, case: Dict[str, Any]):
+        """Decide per metric whether to score it, skip it or reuse a paired score"""
+        responses = case["responses"]
+        contexts_identical = list(case["contexts"]["with"]) == list(
+            case["contexts"]["without"]
         )
+        responses_identical = responses["with"] == responses["without"]
 
-        # Create samples for without_pipeline
-        without_pipeline_sample = SingleTurnSample(
-            user_input=user_query,
-            response=without_pipeline_response,
-            retrieved_contexts=context_without_pipeline,
-            reference=ground_truth,
+        to_score = []
+        reused = {}
+        skipped = set()
+        for key, label, attr, pipeline in METRIC_SPECS:
+            if not self.plan.selects(key, attr):
+                continue
+            if self.plan.should_skip(attr, responses[pipeline]):
+                logger.info(f"- {label} skipped: empty response")
+                skipped.add(key)
+                continue
+            paired_key = key.replace("_without_pipeline", "_with_pipeline")
+            if (
+                pipeline == "without"
+                and self.plan.selects(paired_key, attr)
+                and paired_key not in skipped
+                and self.plan.can_reuse(attr, contexts_identical, responses_identical)
+            ):
+                reused[key] = paired_key
+                continue
+            to_score.append((key, label, attr, pipeline))
+        return to_score, reused, skipped
+
+    def _score_planned(
+        self, cases: List[Dict[str, Any]], plans: List[tuple]
+    ) -> List[Dict[str, Any]]:
+        """Run the judge for every metric the plans left to score"""
+        from ragas import SingleTurnSample
+
+        scores: List[Dict[str, Any]] = [{} for _ in cases]
+
+        # Group jobs the batched executor can take by metric
+        batched_jobs: Dict[str, List[tuple]] = {}
+        single_jobs = []
+        for case_no, (to_score, _, _) in enumerate(plans):
+            for job in to_score:
+                attr = job[2]
+                if self.batch_size > 1 and attr in BatchedMetricExecutor.SUPPORTED:
+                    batched_jobs.setdefault(attr, []).append((case_no, job))
+                else:
+                    single_jobs.append((case_no, job))
+
+        for attr, jobs in batched_jobs.items():
+            samples = [
+                {
+                    "question": cases[case_no]["question"],
+                    "response": cases[case_no]["responses"][pipeline],
+                    "contexts": cases[case_no]["contexts"][pipeline],
+                    "reference": cases[case_no]["reference"],
+                }
+                for case_no, (_, _, _, pipeline) in jobs
+            ]
+            logger.info(f"Calculating {attr} for {len(samples)} samples (batched)...")
+            for (case_no, (key, label, _, _)), score in zip(
+                jobs, self.batched_executor.score(attr, samples)
+            ):
+                if score is None:
+                    logger.error(f"✗ {label} failed: no judge verdict")
+                else:
+                    logger.info(f"✓ {label}: {score:.4f}")
+                scores[case_no][key] = score
+
+        # Score the remaining metrics concurrently; the shared controller caps
+        # how many judge calls are actually in flight and backs off when
+        # Bedrock throttles
+        if single_jobs:
+
+            def sample(case_no: int, pipeline: str) -> SingleTurnSample:
+                case = cases[case_no]
+                return SingleTurnSample(
+                    user_input=case["question"],
+                    response=case["responses"][pipeline],
+                    retrieved_contexts=case["contexts"][pipeline],
+                    reference=case["reference"],
+                )
+
+            workers = min(len(single_jobs), controller.max_workers("bedrock"))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    (
+                        case_no,
+                        key,
+                        executor.submit(
+                            self._score_metric,
+                            label,
+                            self.metric(attr),
+                            sample(case_no, pipeline),
+                        ),
+                    )
+                    for case_no, (key, label, attr, pipeline) in single_jobs
+                ]
+                for case_no, key, future in futures:
+                    scores[case_no][key] = future.result()
+
+        return scores
+
+    def evaluate_metrics_batch(
+        self, cases: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Calculate the planned metrics for several test cases together.
+
+        With ``batch_size`` > 1, metrics the batched executor supports are
+        scored for all cases at once with multi-item judge prompts; the rest
+        go through RAGAS one sample at a time.
+        """
+        plans = [self._plan_case(case) for case in cases]
+
+        # Reused paired scores count as hits, judged metrics as misses
+        for to_score, reused, _ in plans:
+            for _ in reused:
+                self.progress.record_cache("metric_score", hit=True)
+            for _ in to_score:
+                self.progress.record_cache("metric_score", hit=False)
+        self.progress.set_queue_depth(
+            "judge_metrics", sum(len(to_score) for to_score, _, _ in plans)
         )
 
-        # Calculate Context Precision (with pipeline) with error handling
         try:
-            logger.info("Calculating Context Precision (with pipeline)...")
-            metrics["context_precision_with_pipeline"] = (
-                self.context_precision.single_turn_score(with_pipeline_sample)
-            )
+            scores = self._score_planned(cases, plans)
+        finally:
+            self.progress.set_queue_depth("judge_metrics", 0)
+
+        results = []
+        for case_scores, (_, reused, skipped) in zip(scores, plans):
+            for key, paired_key in reused.items():
+                logger.info(f"= {key} reused from {paired_key} (identical contexts)")
+                case_scores[key] = case_scores.get(paired_key)
+
+            # Keep the canonical metric order for logging and CSV output
+            metrics = {
+                key: case_scores.get(key)
+                for key, _, _, _ in METRIC_SPECS
+                if key in case_scores or key in skipped
+            }
             logger.info(
-                f"✓ Context Precision (with pipeline): {metrics['context_precision_with_pipeline']:.4f}"
+                f"Metrics calculation completed. Success rate: {sum(1 for v in metrics.values() if v is not None)}/{len(metrics)}"
             )
+            # Skipped metrics are None like failed ones; list them so the
+            # results can tell the two apart
+            if skipped:
+                metrics["skipped_metrics"] = [
+                    key for key, _, _, _ in METRIC_SPECS if key in skipped
+                ]
+            results.append(metrics)
+        return results
+
+    def read_csv(self, file_path: str, limit: int = 100) -> CaseFile:
+        """Index the test case CSV; rows are parsed from disk when accessed"""
+        try:
+            test_cases = CaseFile(file_path, limit)
+            logger.info(f"Read {len(test_cases)} rows from {file_path}")
+            return test_cases
+        except FileNotFoundError:
+            logger.error(f"CSV file not found: {file_path}")
+            raise
         except Exception as e:
-            logger.error(
-                f"✗ Context Precision (with pipeline) failed: {str(e)[:200]}..."
-            )
-            metrics["context_precision_with_pipeline"] = None
+            logger.error(f"Error reading CSV: {str(e)}")
+            raise
+
+    def _prepare_test_case(
+        self,
+        index: int,
+        test_case: Dict[str, str],
+        total: int,
+        results: ResultStore,
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch the API responses for one test case.
+
+        Returns the case to score, or None after recording why it was skipped
+        or failed in ``results``.
+        """
+        logger.info(f"\n{'=' * 80}")
+        logger.info(f"Processing test case {index + 1}/{total}")
+        logger.info(f"{'=' * 80}")
 
-        # Calculate Context Precision (without pipeline) with error handling
         try:
-            logger.info("Calculating Context Precision (without pipeline)...")
-            metrics["context_precision_without_pipeline"] = (
-                self.context_precision.single_turn_score(without_pipeline_sample)
-            )
-            logger.info(
-                f"✓ Context Precision (without pipeline): {metrics['context_precision_without_pipeline']:.4f}"
+            product_id = test_case.get("product_id") or test_case.get("product")
+            question = test_case.get("question")
+            ground_truth = test_case.get("ground_truth")
+
+            if not all([product_id, question, ground_truth]):
+                logger.warning(f"Skipping test case {index + 1}: Missing required fields")
+                results.append(index, "SKIPPED", error_message="Missing required fields")
+                return None
+
+            logger.info(f"Product ID: {product_id}")
+            logger.info(f"Question: {question}")
+            logger.info(f"Ground Truth: {ground_truth[:100]}...")
+
+            # Call API
+            logger.info("Calling API...")
+            api_response = self.ask_question(product_id, question)
+
+            with_pipeline = api_response.get("with_pipeline", {})
+            without_pipeline = api_response.get("without_pipeline", {})
+
+            with_pipeline_response = with_pipeline.get("ai_response", "")
+            context_with_pipeline = with_pipeline.get("context_with_pipeline", [])
+
+            without_pipeline_response = without_pipeline.get("ai_response", "")
+            context_without_pipeline = without_pipeline.get(
+                "context_without_pipeline", []
             )
+
+            # Only the fields below are needed; drop the rest of the payload
+            # (meta, subqueries, ...) before the slow judge calls
+            del api_response, with_pipeline, without_pipeline
+
+            case = {
+                "question": question,
+                "reference": ground_truth,
+                "responses": {
+                    "with": with_pipeline_response,
+                    "without": without_pipeline_response,
+                },
+                "contexts": {
+                    "with": context_with_pipeline,
+                    "without": context_without_pipeline,
+                },
+            }
+
+            # Empty responses are not an error: the plan skips the metrics
+            # that need one and still scores the context metrics
+            if not (context_with_pipeline and context_without_pipeline):
+                logger.warning(f"Incomplete API response for test case {index + 1}")
+                # Empty or missing context lists are payload anomalies worth
+                # seeing next to the other cases' context sizes
+                results.append(
+                    index,
+                    "FAILED",
+                    profile_contexts([case])[0],
+                    error_message="Incomplete API response",
+                )
+                return None
+
+            return case
+
         except Exception as e:
-            logger.error(
-                f"✗ Context Precision (without pipeline) failed: {str(e)[:200]}..."
+            logger.error(f"Test case {index + 1} failed: {str(e)}", exc_info=True)
+            results.append(index, "FAILED", error_message=str(e))
+            return None
+
+    def _evaluate_chunk(
+        self,
+        indices: List[int],
+        test_cases: CaseFile,
+        results: ResultStore,
+    ):
+        """Evaluate a group of test cases and record their outcomes in ``results``"""
+        prepared = []
+        for index in indices:
+            case = self._prepare_test_case(
+                index, test_cases[index], len(test_cases), results
             )
-            metrics["context_precision_without_pipeline"] = None
+            if case is not None:
+                prepared.append((index, case))
+        if not prepared:
+            return
+
+        # Context sizes are recorded even when judging fails, since oversized
+        # contexts are a likely cause
+        profiles = profile_contexts([case for _, case in prepared])
 
-        # Calculate Context Recall (with pipeline) with error handling
+        # Evaluate metrics
         try:
-            logger.info("Calculating Context Recall (with pipeline)...")
-            metrics["context_recall_with_pipeline"] = (
-                self.context_recall.single_turn_score(with_pipeline_sample)
-            )
-            logger.info(
-                f"✓ Context Recall (with pipeline): {metrics['context_recall_with_pipeline']:.4f}"
-            )
+            logger.info("Evaluating metrics...")
+            all_metrics = self.evaluate_metrics_batch([case for _, case in prepared])
+        except JudgeInitializationError:
+            # No later case can be scored either; abort the run
+            raise
         except Exception as e:
-            logger.error(f"✗ Context Recall (with pipeline) failed: {str(e)[:200]}...")
-            metrics["context_recall_with_pipeline"] = None
+            for (index, _), profile in zip(prepared, profiles):
+                logger.error(f"Test case {index + 1} failed: {str(e)}", exc_info=True)
+                results.append(index, "FAILED", profile, error_message=str(e))
+            return
 
-        # Calculate Context Recall (without pipeline) with error handling
-        try:
-            logger.info("Calculating Context Recall (without pipeline)...")
-            metrics["context_recall_without_pipeline"] = (
-                self.context_recall.single_turn_score(without_pipeline_sample)
+        # Store results; the responses and contexts are released on return
+        for (index, _), metrics, profile in zip(prepared, all_metrics, profiles):
+            skipped = metrics.pop("skipped_metrics", [])
+            results.append(
+                index, "SUCCESS", {**metrics, **profile}, skipped_metrics=skipped
             )
+
+            logger.info(f"Test case {index + 1} completed successfully")
             logger.info(
-                f"✓ Context Recall (without pipeline): {metrics['context_recall_without_pipeline']:.4f}"
+                f"  Context Precision (with): {metrics.get('context_precision_with_pipeline', 'N/A')}"
             )
-        except Exception as e:
-            logger.error(
-                f"✗ Context Recall (without pipeline) failed: {str(e)[:200]}..."
-            )
-            metrics["context_recall_without_pipeline"] = None
-
-        # Calculate Faithfulness (with pipeline) with error handling
-        try:
-            logger.info("Calculating Faithfulness (with pipeline)...")
-            metrics["faithfulness_with_pipeline"] = self.faithfulness.single_turn_score(
-                with_pipeline_sample
+            logger.info(
+                f"  Context Precision (without): {metrics.get('context_precision_without_pipeline', 'N/A')}"
             )
             logger.info(
-                f"✓ Faithfulness (with pipeline): {metrics['faithfulness_with_pipeline']:.4f}"
+                f"  Context Recall (with): {metrics.get('context_recall_with_pipeline', 'N/A')}"
             )
-        except Exception as e:
-            logger.error(f"✗ Faithfulness (with pipeline) failed: {str(e)[:200]}...")
-            metrics["faithfulness_with_pipeline"] = None
-
-        # Calculate Faithfulness (without pipeline) with error handling
-        try:
-            logger.info("Calculating Faithfulness (without pipeline)...")
-            metrics["faithfulness_without_pipeline"] = (
-                self.faithfulness.single_turn_score(without_pipeline_sample)
+            logger.info(
+                f"  Context Recall (without): {metrics.get('context_recall_without_pipeline', 'N/A')}"
             )
             logger.info(
-                f"✓ Faithfulness (without pipeline): {metrics['faithfulness_without_pipeline']:.4f}"
+                f"  Faithfulness (with): {metrics.get('faithfulness_with_pipeline', 'N/A')}"
             )
-        except Exception as e:
-            logger.error(f"✗ Faithfulness (without pipeline) failed: {str(e)[:200]}...")
-            metrics["faithfulness_without_pipeline"] = None
-
-        # Calculate Noise Sensitivity (with pipeline) with error handling
-        try:
-            logger.info("Calculating Noise Sensitivity (with pipeline)...")
-            metrics["noise_sensitivity_with_pipeline"] = (
-                self.noise_sensitivity.single_turn_score(with_pipeline_sample)
+            logger.info(
+                f"  Faithfulness (without): {metrics.get('faithfulness_without_pipeline', 'N/A')}"
             )
             logger.info(
-                f"✓ Noise Sensitivity (with pipeline): {metrics['noise_sensitivity_with_pipeline']:.4f}"
+                f"  Noise Sensitivity (with): {metrics.get('noise_sensitivity_with_pipeline', 'N/A')}"
             )
-        except Exception as e:
-            logger.error(
-                f"✗ Noise Sensitivity (with pipeline) failed: {str(e)[:200]}..."
+            logger.info(
+                f"  Contexts (with/without): "
+                f"{profile['context_count_with_pipeline']}/{profile['context_count_without_pipeline']} chunks, "
+                f"~{profile['context_tokens_with_pipeline']}/{profile['context_tokens_without_pipeline']} tokens, "
+                f"overlap {profile['context_overlap']:.2f}"
             )
-            metrics["noise_sensitivity_with_pipeline"] = None
-
-        logger.info(
-            f"Metrics calculation completed. Success rate: {sum(1 for v in metrics.values() if v is not None)}/{len(metrics)}"
-        )
-        return metrics
-
-    def read_csv(self, file_path: str, limit: int = 100) -> List[Dict[str, str]]:
-        """Read CSV file with test cases"""
-        try:
-            with open(file_path, mode="r", newline="", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                data = [row for row in reader][:limit]
-            logger.info(f"Read {len(data)} rows from {file_path}")
-            return data
-        except FileNotFoundError:
-            logger.error(f"CSV file not found: {file_path}")
-            raise
-        except Exception as e:
-            logger.error(f"Error reading CSV: {str(e)}")
-            raise
-
-    def write_results_csv(self, results: List[Dict[str, Any]], output_path: str):
-        """Write evaluation results to CSV file"""
-        if not results:
-            logger.warning("No results to write")
-            return
-
-        try:
-            # Define all columns
-            fieldnames = [
-                "test_case_index",
-                "product_id",
-                "question",
-                "ground_truth",
-                "context_precision_with_pipeline",
-                "context_precision_without_pipeline",
-                "context_recall_with_pipeline",
-                "context_recall_without_pipeline",
-                "faithfulness_with_pipeline",
-                "faithfulness_without_pipeline",
-                "noise_sensitivity_with_pipeline",
-                "status",
-                "error_message",
-            ]
-
-            with open(output_path, mode="w", newline="", encoding="utf-8") as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(results)
-
-            logger.info(f"Results written to {output_path}")
-        except Exception as e:
-            logger.error(f"Error writing results CSV: {str(e)}")
-            raise
 
     def run_evaluation(
         self, input_csv_path: str, output_csv_path: str, limit: int = 100
@@ -325,196 +691,188 @@ class RAGEvaluator:
         logger.info("Starting RAG Pipeline Evaluation")
         logger.info("=" * 80)
 
-        # Read input CSV
-        test_cases = self.read_csv(input_csv_path, limit)
-        results = []
-
-        successful = 0
-        failed = 0
-        skipped = 0
-
-        for index, test_case in enumerate(test_cases):
-            logger.info(f"\n{'=' * 80}")
-            logger.info(f"Processing test case {index + 1}/{len(test_cases)}")
-            logger.info(f"{'=' * 80}")
-
-            try:
-                product_id = test_case.get("product_id") or test_case.get("product")
-                question = test_case.get("question")
-                ground_truth = test_case.get("ground_truth")
-
-                if not all([product_id, question, ground_truth]):
-                    logger.warning(
-                        f"Skipping test case {index + 1}: Missing required fields"
-                    )
-                    results.append(
-                        {
-                            "test_case_index": index + 1,
-                            "product_id": product_id,
-                            "question": question,
-                            "ground_truth": ground_truth,
-                            "status": "SKIPPED",
-                            "error_message": "Missing required fields",
-                        }
-                    )
-                    skipped += 1
-                    continue
-
-                logger.info(f"Product ID: {product_id}")
-                logger.info(f"Question: {question}")
-                logger.info(f"Ground Truth: {ground_truth[:100]}...")
-
-                # Call API
-                logger.info("Calling API...")
-                api_response = self.ask_question(product_id, question)
-
-                with_pipeline = api_response.get("with_pipeline", {})
-                without_pipeline = api_response.get("without_pipeline", {})
-
-                with_pipeline_response = with_pipeline.get("ai_response", "")
-                context_with_pipeline = with_pipeline.get("context_with_pipeline", [])
-
-                without_pipeline_response = without_pipeline.get("ai_response", "")
-                context_without_pipeline = without_pipeline.get(
-                    "context_without_pipeline", []
-                )
-
-                if not all(
-                    [
-                        with_pipeline_response,
-                        without_pipeline_response,
-                        context_with_pipeline,
-                        context_without_pipeline,
-                    ]
-                ):
-                    logger.warning(f"Incomplete API response for test case {index + 1}")
-                    results.append(
-                        {
-                            "test_case_index": index + 1,
-                            "product_id": product_id,
-                            "question": question,
-                            "ground_truth": ground_truth,
-                            "status": "FAILED",
-                            "error_message": "Incomplete API response",
-                        }
-                    )
-                    failed += 1
-                    continue
+        # Read input CSV. Rows are read back from the file while results are
+        # written and summarized, so it stays open for the whole run.
+        with self.read_csv(input_csv_path, limit) as test_cases:
+            self._evaluate_cases(test_cases, output_csv_path)
+
+    def _evaluate_cases(self, test_cases: CaseFile, output_csv_path: str):
+        """Score the selected test cases, then log the summary"""
+        # Results are kept as compact columns and streamed to the output CSV
+        results = ResultStore(
+            [key for key, _, _, _ in METRIC_SPECS]
+            + [key for key in PROFILE_FIELDS if key not in COUNT_FIELDS],
+            test_cases,
+            progress=self.progress,
+            count_keys=COUNT_FIELDS,
+            run_fields={"scorer": SCORER},
+        )
 
-                # Evaluate metrics
-                logger.info("Evaluating metrics...")
-                metrics = self.evaluate_metrics(
-                    user_query=question,
-                    ground_truth=ground_truth,
-                    with_pipeline_response=with_pipeline_response,
-                    context_with_pipeline=context_with_pipeline,
-                    without_pipeline_response=without_pipeline_response,
-                    context_without_pipeline=context_without_pipeline,
-                )
+        # Optionally score only a statistically sized random sample. Done
+        # before opening the output so a bad plan leaves the old results intact.
+        selected = self.plan.select_cases(len(test_cases))
+        if len(selected) < len(test_cases):
+            logger.info(
+                f"Sampling {len(selected)}/{len(test_cases)} test cases "
+                f"(±{self.plan.margin_of_error} at {self.plan.confidence:.0%} confidence)"
+            )
 
-                # Store results
-                result_entry = {
-                    "test_case_index": index + 1,
-                    "product_id": product_id,
-                    "question": question,
-                    "ground_truth": ground_truth,
-                    "context_precision_with_pipeline": metrics.get(
-                        "context_precision_with_pipeline"
-                    ),
-                    "context_precision_without_pipeline": metrics.get(
-                        "context_precision_without_pipeline"
-                    ),
-                    "context_recall_with_pipeline": metrics.get(
-                        "context_recall_with_pipeline"
-                    ),
-                    "context_recall_without_pipeline": metrics.get(
-                        "context_recall_without_pipeline"
-                    ),
-                    "faithfulness_with_pipeline": metrics.get(
-                        "faithfulness_with_pipeline"
-                    ),
-                    "faithfulness_without_pipeline": metrics.get(
-                        "faithfulness_without_pipeline"
-                    ),
-                    "noise_sensitivity_with_pipeline": metrics.get(
-                        "noise_sensitivity_with_pipeline"
-                    ),
-                    "status": "SUCCESS",
-                    "error_message": "",
-                }
+        results.open_csv(output_csv_path, RESULT_FIELDS)
 
-                results.append(result_entry)
-                successful += 1
+        self.progress.set_total(len(selected))
 
-                logger.info(f"Test case {index + 1} completed successfully")
-                logger.info(
-                    f"  Context Precision (with): {metrics.get('context_precision_with_pipeline', 'N/A')}"
-                )
-                logger.info(
-                    f"  Context Precision (without): {metrics.get('context_precision_without_pipeline', 'N/A')}"
-                )
-                logger.info(
-                    f"  Context Recall (with): {metrics.get('context_recall_with_pipeline', 'N/A')}"
-                )
-                logger.info(
-                    f"  Context Recall (without): {metrics.get('context_recall_without_pipeline', 'N/A')}"
-                )
-                logger.info(
-                    f"  Faithfulness (with): {metrics.get('faithfulness_with_pipeline', 'N/A')}"
-                )
-                logger.info(
-                    f"  Faithfulness (without): {metrics.get('faithfulness_without_pipeline', 'N/A')}"
-                )
-                logger.info(
-                    f"  Noise Sensitivity (with): {metrics.get('noise_sensitivity_with_pipeline', 'N/A')}"
+        try:
+            for start in range(0, len(selected), self.batch_size):
+                self.progress.set_queue_depth("cases", len(selected) - start)
+                self._evaluate_chunk(
+                    selected[start : start + self.batch_size], test_cases, results
                 )
+        finally:
+            results.close()
+            self.progress.set_queue_depth("cases", 0)
 
-                # Write intermediate results
-                self.write_results_csv(results, output_csv_path)
-
-            except Exception as e:
-                logger.error(f"Test case {index + 1} failed: {str(e)}", exc_info=True)
-                error_entry = {
-                    "test_case_index": index + 1,
-                    "product_id": test_case.get("product_id")
-                    or test_case.get("product"),
-                    "question": test_case.get("question"),
-                    "ground_truth": test_case.get("ground_truth"),
-                    "status": "FAILED",
-                    "error_message": str(e),
-                }
-                results.append(error_entry)
-                failed += 1
-                self.write_results_csv(results, output_csv_path)
-                continue
+        if self.batch_size > 1 and self._batched_executor is not None:
+            logger.info(
+                f"Batched judge requests: {self._batched_executor.judge.request_count}"
+            )
 
-        # Final results write
         logger.info(f"\n{'=' * 80}")
-        logger.info("Writing final results to CSV...")
-        self.write_results_csv(results, output_csv_path)
+        logger.info(f"Results written to {output_csv_path}")
 
         # Print summary
         logger.info(f"\n{'=' * 80}")
         logger.info("EVALUATION SUMMARY")
         logger.info(f"{'=' * 80}")
         logger.info(f"Total test cases: {len(results)}")
-        logger.info(f"Successful: {successful}")
-        logger.info(f"Failed: {failed}")
-        logger.info(f"Skipped: {skipped}")
+        logger.info(f"Successful: {results.count('SUCCESS')}")
+        logger.info(f"Failed: {results.count('FAILED')}")
+        logger.info(f"Skipped: {results.count('SKIPPED')}")
         logger.info(f"Output file: {output_csv_path}")
         logger.info(f"{'=' * 80}")
 
+        largest = largest_by_group(
+            results.product_ids(), results.column("context_tokens_with_pipeline")
+        )
+        if largest:
+            logger.info("LARGEST CONTEXTS (mean estimated tokens, with pipeline)")
+            for product_id, tokens, cases in largest:
+                logger.info(f"  {product_id}: {tokens:.0f} (n={cases})")
+            logger.info(f"{'=' * 80}")
+
+        if self.plan.sampling:
+            columns = {
+                key: results.column(key)
+                for key, _, attr, _ in METRIC_SPECS
+                if self.plan.selects(key, attr)
+            }
+            intervals = self.plan.confidence_intervals(
+                columns, population=len(test_cases)
+            )
+            logger.info(f"METRIC ESTIMATES ({self.plan.confidence:.0%} confidence)")
+            for key in columns:
+                interval = intervals.get(key)
+                if interval is None:
+                    logger.info(f"  {key}: no scores (skipped={results.skipped(key)})")
+                    continue
+                logger.info(
+                    f"  {key}: {interval['mean']:.4f} "
+                    f"[{interval['low']:.4f}, {interval['high']:.4f}] "
+                    f"(n={interval['n']}, skipped={results.skipped(key)})"
+                )
+            logger.info(f"{'=' * 80}")
 
-def main():
-    input_csv = "Rag Pipeline Analysis Data - Sheet1_with_product_ids2.csv"
-    output_csv = "rag_evaluation_results.csv"
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evaluate the RAG pipeline with RAGAS")
+    parser.add_argument(
+        "--input", default="Rag Pipeline Analysis Data - Sheet1_with_product_ids2.csv"
+    )
+    parser.add_argument("--output", default="rag_evaluation_results.csv")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument(
+        "--metrics",
+        nargs="+",
+        choices=METRIC_NAMES,
+        metavar="METRIC",
+        help="Metric families or result keys to score (default: all): "
+        + ", ".join(METRIC_NAMES),
+    )
+    parser.add_argument(
+        "--no-reuse",
+        action="store_true",
+        help="Always score without-pipeline metrics, even for identical contexts",
+    )
+    parser.add_argument(
+        "--min-response-chars",
+        type=int,
+        default=1,
+        help="Skip response-based metrics for shorter responses",
+    )
+    parser.add_argument(
+        "--margin-of-error",
+        type=float,
+        help="Score a random sample sized for this margin on each metric mean",
+    )
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Score this many test cases together with multi-item judge prompts",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics for the run on this local port",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Show a live progress view (throughput, ETA, in-flight requests)",
+    )
+    args = parser.parse_args(argv)
+    if args.margin_of_error is not None and args.margin_of_error <= 0:
+        parser.error("--margin-of-error must be positive")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence must be between 0 and 1 (exclusive)")
+    return args
+
+
+def main():
+    args = parse_args()
+    plan = EvaluationPlan(
+        metrics=args.metrics,
+        reuse_identical_contexts=not args.no_reuse,
+        min_response_chars=args.min_response_chars,
+        margin_of_error=args.margin_of_error,
+        confidence=args.confidence,
+        seed=args.seed,
+    )
+
+    metrics_server = terminal = None
     try:
-        evaluator = RAGEvaluator()
-        evaluator.run_evaluation(input_csv, output_csv, limit=100)
+        evaluator = RAGEvaluator(plan, batch_size=args.batch_size)
+        if args.metrics_port:
+            metrics_server = MetricsServer(
+                evaluator.progress, args.metrics_port
+            ).start()
+        if args.progress:
+            terminal = TerminalProgress(evaluator.progress)
+            if terminal.interactive:
+                # Per-case log lines would scroll the live view away
+                logging.getLogger().setLevel(logging.WARNING)
+            terminal.start()
+
+        evaluator.run_evaluation(args.input, args.output, limit=args.limit)
     except Exception as e:
         logger.error(f"Evaluation failed: {str(e)}", exc_info=True)
         sys.exit(1)
+    finally:
+        if terminal:
+            terminal.stop()
+        if metrics_server:
+            metrics_server.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+import csv
+import math
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from case_file import CaseFile
+
+from progress import ProgressTracker
+
+STATUSES = ("SUCCESS", "FAILED", "SKIPPED")
+
+
+def _product_id(test_case: Dict[str, str]) -> Optional[str]:
+    return test_case.get("product_id") or test_case.get("product")
+
+
+class ResultStore:
+    """Column-oriented evaluation results with a small fixed cost per case.
+
+    Metric scores live in ``array('d')`` columns (NaN for missing), status and
+    error message are small integer codes, and the question / ground truth /
+    product id are not kept at all: each row keeps the offset of its input
+    test case and reads the text back from the ``CaseFile`` when a row is
+    written out. A 100k-case run therefore holds roughly 8 bytes per column
+    per case, independent of how long the questions and answers are.
+    Whole-number columns (``count_keys``) are kept as ``array('q')`` with -1
+    for missing.
+    """
+
+    def __init__(
+        self,
+        metric_keys: Sequence[str],
+        test_cases: CaseFile,
+        progress: Optional[ProgressTracker] = None,
+        count_keys: Sequence[str] = (),
+        run_fields: Optional[Dict[str, str]] = None,
+    ):
+        self.metric_keys = list(metric_keys)
+        self.count_keys = list(count_keys)
+        self.progress = progress
+        # Values shared by every row of the run, such as the scorer
+        self.run_fields = dict(run_fields or {})
+        self._test_cases = test_cases
+        self._offsets = array("l")
+        self._status = array("b")
+        self._error = array("l")
+        self._skipped = array("l")
+        self._metrics = {key: array("d") for key in self.metric_keys}
+        self._counts = {key: array("q") for key in self.count_keys}
+        # Error messages ("Incomplete API response", timeouts) and skipped
+        # metric lists repeat heavily, so each distinct text is stored once
+        self._messages: List[str] = [""]
+        self._message_codes: Dict[str, int] = {"": 0}
+        self._file = None
+        self._writer = None
+
+    def open_csv(self, output_path: str, fieldnames: Sequence[str]):
+        """Stream every appended row to ``output_path`` as it is recorded"""
+        self._file = open(output_path, mode="w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def append(
+        self,
+        case_offset: int,
+        status: str,
+        metrics: Optional[Dict[str, Optional[float]]] = None,
+        error_message: str = "",
+        skipped_metrics: Sequence[str] = (),
+    ):
+        """Record the outcome of the test case at ``case_offset``.
+
+        ``skipped_metrics`` lists metrics left unscored on purpose (e.g. empty
+        response), as opposed to metrics whose judge call failed.
+        """
+        metrics = metrics or {}
+        self._offsets.append(case_offset)
+        self._status.append(STATUSES.index(status))
+        self._error.append(self._code(error_message))
+        self._skipped.append(self._code(";".join(skipped_metrics)))
+
+        for key, column in self._metrics.items():
+            value = metrics.get(key)
+            column.append(math.nan if value is None else float(value))
+        for key, column in self._counts.items():
+            value = metrics.get(key)
+            column.append(-1 if value is None else int(value))
+
+        # Appending one row keeps intermediate results on disk without
+        # rewriting the whole file after every case
+        if self._writer is not None:
+            self._writer.writerow(self.row(len(self) - 1))
+            self._file.flush()
+
+        if self.progress is not None:
+            self.progress.record(status)
+
+    def _code(self, text: str) -> int:
+        code = self._message_codes.get(text)
+        if code is None:
+            code = self._message_codes[text] = len(self._messages)
+            self._messages.append(text)
+        return code
+
+    def column(self, key: str) -> array:
+        """Values of one column in row order, NaN (or -1 for counts) where missing"""
+        if key in self._counts:
+            return self._counts[key]
+        return self._metrics[key]
+
+    def count(self, status: str) -> int:
+        return self._status.count(STATUSES.index(status))
+
+    def skipped(self, key: str) -> int:
+        """Number of rows that skipped the metric ``key`` on purpose"""
+        return sum(
+            self._skipped.count(code)
+            for code, text in enumerate(self._messages)
+            if key in text.split(";")
+        )
+
+    def product_ids(self) -> List[Optional[str]]:
+        """Product id of every row, in row order"""
+        return [_product_id(self._test_cases[offset]) for offset in self._offsets]
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Reconstruct one result as the dict written to the results CSV"""
+        offset = self._offsets[index]
+        test_case = self._test_cases[offset]
+        row = {
+            "test_case_index": offset + 1,
+            "product_id": _product_id(test_case),
+            "question": test_case.get("question"),
+            "ground_truth": test_case.get("ground_truth"),
+        }
+        for key, column in self._metrics.items():
+            value = column[index]
+            row[key] = None if math.isnan(value) else value
+        for key, column in self._counts.items():
+            value = column[index]
+            row[key] = None if value < 0 else value
+        row.update(self.run_fields)
+        row["status"] = STATUSES[self._status[index]]
+        row["error_message"] = self._messages[self._error[index]]
+        row["skipped_metrics"] = self._messages[self._skipped[index]]
+        return row
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.row(index)
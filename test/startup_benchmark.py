@@ -0,0 +1,137 @@
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Each target runs in a fresh interpreter, the way a short-lived Lambda-style
+# worker would start. "interpreter" is the floor every other target pays.
+TARGETS = {
+    "interpreter": ["-c", "pass"],
+    "import_rag_evaluation": ["-c", "import rag_evaluation"],
+    "rag_evaluation_help": ["rag_evaluation.py", "--help"],
+    "evaluator_cold_start": [
+        "-c",
+        "import rag_evaluation; rag_evaluation.RAGEvaluator()",
+    ],
+    "import_product_handler": ["-c", "import product_handler"],
+    "import_lambda_runner": ["-c", "import create_product_lambda_runner"],
+    "nova_llm_cold_start": ["-c", "import llm_client; llm_client.NovaLLM()"],
+}
+
+# Builds the Bedrock judge and a metric, i.e. the full cost of the first score.
+# Needs langchain_aws/ragas installed and an AWS profile, so it is opt-in.
+BACKEND_TARGETS = {
+    "evaluator_first_metric": [
+        "-c",
+        "import rag_evaluation; rag_evaluation.RAGEvaluator().metric('faithfulness')",
+    ],
+}
+
+
+def time_target(args: List[str], repeat: int) -> Dict[str, float]:
+    """Run a target in fresh interpreters and return wall-clock stats in ms"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, *args],
+            cwd=HERE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        timings.append(elapsed)
+    return {
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "max_ms": max(timings),
+    }
+
+
+def load_last_record(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure cold-start cost of the evaluation entry points"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--with-backends",
+        action="store_true",
+        help="Also time building the Bedrock judge and first metric",
+    )
+    parser.add_argument(
+        "--record",
+        help="Append results to this JSONL history file",
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Fail if any median is this fraction slower than the last record",
+    )
+    args = parser.parse_args()
+
+    targets = dict(TARGETS)
+    if args.with_backends:
+        targets.update(BACKEND_TARGETS)
+
+    results = {}
+    for name, target_args in targets.items():
+        try:
+            results[name] = time_target(target_args, args.repeat)
+            logger.info(
+                f"{name:<26} median {results[name]['median_ms']:8.1f} ms "
+                f"(min {results[name]['min_ms']:.1f}, max {results[name]['max_ms']:.1f})"
+            )
+        except RuntimeError as e:
+            logger.error(f"{name:<26} failed: {e}")
+
+    exit_code = 0
+    if args.record:
+        previous = load_last_record(args.record)
+        if previous and args.max_regression is not None:
+            for name, stats in results.items():
+                before = previous["results"].get(name)
+                if not before:
+                    continue
+                change = stats["median_ms"] / before["median_ms"] - 1
+                if change > args.max_regression:
+                    logger.error(
+                        f"{name} regressed {change:.0%} "
+                        f"({before['median_ms']:.1f} -> {stats['median_ms']:.1f} ms)"
+                    )
+                    exit_code = 1
+
+        with open(args.record, "a", encoding="utf-8") as f:
+            record = {"timestamp": time.time(), "python": sys.version.split()[0]}
+            record["results"] = results
+            f.write(json.dumps(record) + "\n")
+        logger.info(f"Results appended to {args.record}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
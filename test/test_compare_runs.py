@@ -0,0 +1,245 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from compare_runs import align, bootstrap_mean, compare, load_run
+
+FIELDS = [
+    "test_case_index",
+    "product_id",
+    "question",
+    "faithfulness_with_pipeline",
+    "noise_sensitivity_with_pipeline",
+    "scorer",
+    "status",
+    "skipped_metrics",
+]
+
+
+def row(index, score=0.5, noise=0.2, status="SUCCESS", skipped="", **fields):
+    return {
+        "test_case_index": index,
+        "product_id": f"P{index % 7}",
+        "question": f"question {index}?",
+        "faithfulness_with_pipeline": "" if score is None else score,
+        "noise_sensitivity_with_pipeline": "" if noise is None else noise,
+        "scorer": "ragas",
+        "status": status,
+        "skipped_metrics": skipped,
+        **fields,
+    }
+
+
+class RunFilesTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+    def write(self, name, rows, fields=FIELDS):
+        path = os.path.join(self._dir.name, name)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+
+class LoadRunTest(RunFilesTest):
+    def test_drops_repeated_keys_and_unsuccessful_scores(self):
+        path = self.write(
+            "run.csv",
+            [row(0, 0.9), row(1, 0.4, status="FAILED"), row(0, 0.1), row(2, None)],
+        )
+        keys, metrics, _, scorers = load_run(path)
+
+        self.assertEqual(len(keys), 3)
+        scores = metrics["faithfulness_with_pipeline"]
+        self.assertEqual(scores[0], 0.9)
+        self.assertTrue(np.isnan(scores[1]))
+        self.assertTrue(np.isnan(scores[2]))
+        self.assertEqual(scorers, ["ragas"])
+
+    def test_reads_multiline_questions(self):
+        path = self.write("run.csv", [row(0, question="first line\nsecond line")])
+        keys, metrics, _, _ = load_run(path)
+        self.assertEqual(keys.to_pylist(), ["P0\x1ffirst line\nsecond line"])
+        self.assertEqual(metrics["faithfulness_with_pipeline"][0], 0.5)
+
+    def test_skip_masks_follow_the_skip_lists(self):
+        path = self.write(
+            "run.csv",
+            [
+                row(0, None, skipped="faithfulness_with_pipeline"),
+                row(1),
+                row(
+                    2,
+                    None,
+                    None,
+                    skipped="faithfulness_with_pipeline;noise_sensitivity_with_pipeline",
+                ),
+            ],
+        )
+        _, _, skipped, _ = load_run(path)
+        self.assertEqual(
+            skipped["faithfulness_with_pipeline"].tolist(), [True, False, True]
+        )
+        self.assertEqual(
+            skipped["noise_sensitivity_with_pipeline"].tolist(), [False, False, True]
+        )
+
+    def test_runs_without_scorer_column_count_as_ragas(self):
+        fields = [name for name in FIELDS if name != "scorer"]
+        path = self.write("run.csv", [row(0)], fields)
+        self.assertEqual(load_run(path)[3], ["ragas"])
+
+    def test_missing_required_column_is_an_error(self):
+        fields = [name for name in FIELDS if name != "question"]
+        path = self.write("run.csv", [row(0)], fields)
+        with self.assertRaises(ValueError):
+            load_run(path)
+
+
+class AlignTest(RunFilesTest):
+    def test_pairs_rows_by_product_and_question(self):
+        baseline = self.write("base.csv", [row(i) for i in range(5)])
+        candidate = self.write("cand.csv", [row(i) for i in (4, 2, 9, 0)])
+        base_idx, cand_idx = align(load_run(baseline)[0], load_run(candidate)[0])
+        self.assertEqual(base_idx.tolist(), [0, 2, 4])
+        self.assertEqual(cand_idx.tolist(), [3, 1, 0])
+
+    def test_same_question_for_another_product_is_not_paired(self):
+        baseline = self.write("base.csv", [row(0)])
+        candidate = self.write("cand.csv", [row(0, product_id="other")])
+        base_idx, _ = align(load_run(baseline)[0], load_run(candidate)[0])
+        self.assertEqual(len(base_idx), 0)
+
+
+class CompareTest(RunFilesTest):
+    def compare(self, baseline_rows, candidate_rows, **options):
+        return compare(
+            self.write("base.csv", baseline_rows),
+            self.write("cand.csv", candidate_rows),
+            **options,
+        )
+
+    def test_identical_runs_pass(self):
+        rows = [row(i, score=(i % 10) / 10) for i in range(100)]
+        report = self.compare(rows, rows)
+        self.assertEqual(report["regressions"], [])
+        self.assertEqual(report["metrics"]["faithfulness_with_pipeline"]["n"], 100)
+
+    def test_failed_cases_count_as_lost_scores(self):
+        baseline = [row(i) for i in range(100)]
+        candidate = [row(i, status="FAILED") if i < 5 else row(i) for i in range(100)]
+        report = self.compare(baseline, candidate)
+
+        entry = report["metrics"]["faithfulness_with_pipeline"]
+        self.assertEqual(entry["lost"], 5)
+        self.assertAlmostEqual(entry["lost_rate"], 0.05)
+        self.assertIn("faithfulness_with_pipeline", report["regressions"])
+
+    def test_intentional_skips_are_not_lost(self):
+        baseline = [row(i) for i in range(100)]
+        candidate = [
+            row(i, None, skipped="faithfulness_with_pipeline") if i < 20 else row(i)
+            for i in range(100)
+        ]
+        entry = self.compare(baseline, candidate)["metrics"][
+            "faithfulness_with_pipeline"
+        ]
+        self.assertEqual(entry["lost"], 0)
+        self.assertEqual(entry["skipped"], 20)
+        self.assertFalse(entry["regressed"])
+
+    def test_metric_missing_from_candidate_is_all_lost(self):
+        baseline = self.write("base.csv", [row(i) for i in range(50)])
+        fields = [name for name in FIELDS if name != "noise_sensitivity_with_pipeline"]
+        candidate = self.write("cand.csv", [row(i) for i in range(50)], fields)
+        report = compare(baseline, candidate)
+        self.assertEqual(
+            report["metrics"]["noise_sensitivity_with_pipeline"]["lost"], 50
+        )
+        self.assertIn("noise_sensitivity_with_pipeline", report["regressions"])
+
+    def test_too_few_paired_rows_regress(self):
+        report = self.compare([row(i) for i in range(100)], [row(i) for i in range(90)])
+        self.assertAlmostEqual(report["paired_fraction"], 0.9)
+        self.assertIn("paired_rows", report["regressions"])
+
+    def test_different_scorers_are_refused(self):
+        with self.assertRaises(ValueError):
+            self.compare([row(0)], [row(0, scorer="other")])
+
+    def test_mixed_scorers_within_a_run_are_refused(self):
+        with self.assertRaises(ValueError):
+            self.compare([row(0), row(1, scorer="other")], [row(0), row(1)])
+
+    def test_significant_drop_regresses(self):
+        rng = np.random.default_rng(1)
+        baseline = [row(i, score=rng.uniform(0.5, 1)) for i in range(200)]
+        candidate = [
+            row(i, score=float(b["faithfulness_with_pipeline"]) - 0.1)
+            for i, b in enumerate(baseline)
+        ]
+        entry = self.compare(baseline, candidate)["metrics"][
+            "faithfulness_with_pipeline"
+        ]
+        self.assertAlmostEqual(entry["mean_delta"], -0.1)
+        self.assertLess(entry["p_value"], 0.05)
+        self.assertTrue(entry["dropped"])
+
+    def test_drop_below_threshold_passes(self):
+        baseline = [row(i, score=0.8) for i in range(200)]
+        candidate = [row(i, score=0.79) for i in range(200)]
+        entry = self.compare(baseline, candidate)["metrics"][
+            "faithfulness_with_pipeline"
+        ]
+        self.assertFalse(entry["regressed"])
+
+    def test_noise_sensitivity_rise_is_the_regression(self):
+        baseline = [row(i, noise=0.2) for i in range(100)]
+        candidate = [row(i, noise=0.5) for i in range(100)]
+        report = self.compare(baseline, candidate)
+        self.assertIn("noise_sensitivity_with_pipeline", report["regressions"])
+        self.assertNotIn("faithfulness_with_pipeline", report["regressions"])
+
+        improved = self.compare(candidate, baseline)
+        self.assertEqual(improved["regressions"], [])
+
+    def test_small_samples_are_inconclusive(self):
+        report = self.compare([row(0, score=0.8)], [row(0, score=0.1)], min_paired=0)
+        entry = report["metrics"]["faithfulness_with_pipeline"]
+        self.assertTrue(entry["inconclusive"])
+        self.assertNotIn("p_value", entry)
+        self.assertEqual(report["regressions"], [])
+
+        tested = self.compare(
+            [row(0, score=0.8)], [row(0, score=0.1)], min_paired=0, min_n=1
+        )
+        self.assertFalse(
+            tested["metrics"]["faithfulness_with_pipeline"]["inconclusive"]
+        )
+
+
+class BootstrapTest(unittest.TestCase):
+    def test_resampled_means_center_on_the_mean_delta(self):
+        rng = np.random.default_rng(0)
+        deltas = rng.normal(-0.03, 0.2, size=5000)
+        means = bootstrap_mean(deltas, 2000, np.random.default_rng(1))
+
+        self.assertEqual(len(means), 2000)
+        self.assertAlmostEqual(means.mean(), deltas.mean(), places=3)
+        # Standard error of the mean
+        self.assertAlmostEqual(means.std(), deltas.std() / np.sqrt(5000), places=3)
+
+    def test_rounding_error_is_shifted_back(self):
+        deltas = np.full(100, 0.0049)
+        means = bootstrap_mean(deltas, 100, np.random.default_rng(0))
+        np.testing.assert_allclose(means, 0.0049)
+
+
+if __name__ == "__main__":
+    unittest.main()